@@ -1,12 +1,13 @@
+import time
+_SCRIPT_T0 = time.perf_counter()  # cold-start timing (first paint is recorded at the end of the script)
 import os
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
 from src.utils.config import AppConfig
 from src.ui.components import sidebar, overview_tab, clauses_tab, redflags_tab, qa_tab, report_tab
-from src.ingest.pdf_loader import load_pdfs
-from src.ingest.chunker import chunk_documents
+from src.ingest.cache import ingest_uploads
 from src.embeddings.embeddings import get_embedding_model
-from src.vectorstore.faiss_store import FaissStoreManager
 from src.summarize.summarizer import summarize_documents
 from src.analysis.clauses import extract_clauses
 from src.analysis.redflags import detect_redflags
@@ -14,6 +15,8 @@ from src.rag.qa_chain import build_qa_chain
 from src.utils.types import ClauseResult, RedFlagResult
 from src.report.report import build_report
 from src.report.json_export import build_analysis_json
+from src.utils.warmup import start_warmup, mark_first_paint
+from src.utils.workspace import gc_workspace, session_dir
 
 load_dotenv()
 config = AppConfig.from_env()
@@ -93,6 +96,12 @@ if 'qa_chain' not in st.session_state:
     st.session_state.qa_chain = None
 if 'qa_history' not in st.session_state:
     st.session_state.qa_history = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Per-session scratch space in the shared workspace (heartbeat for GC of abandoned sessions)
+session_ns = session_dir(config, st.session_state.session_id)
+gc_workspace(config)
 
 st.markdown("<h2 style='margin-top:0;'>Workspace</h2>", unsafe_allow_html=True)
 uploaded_files = st.file_uploader("Upload legal PDFs", type=["pdf"], accept_multiple_files=True, help="You can add multiple contracts before analyzing.")
@@ -124,21 +133,51 @@ if reset_workspace:
 if 'uploaded_file_names' not in st.session_state:
     st.session_state.uploaded_file_names = []
 
+
+def refresh_qa_chain():
+    """(Re)build the QA chain after the session index changed (Q&A scope is applied per query)."""
+    st.session_state.qa_chain = build_qa_chain(
+        config, st.session_state.vectorstore, st.session_state.get('sentence_index'), st.session_state.get('bm25_index')
+    )
+
+
+def sync_text_indexes(manager, docs, chunks, embed):
+    """Bring the per-session sentence and BM25 indexes in line with the current documents (incremental)."""
+    if st.session_state.vectorstore is None:
+        st.session_state.sentence_index = st.session_state.bm25_index = None
+        return
+    st.session_state.sentence_index = manager.sentence_index(docs, chunks, embed, st.session_state.get('sentence_index'))
+    st.session_state.bm25_index = manager.bm25_index(docs, chunks, embed, st.session_state.get('bm25_index'))
+
 # Auto quick index build on new upload (for immediate chat)
 if uploaded_files:
     current_names = sorted([f.name for f in uploaded_files])
     if current_names != st.session_state.uploaded_file_names:
         with st.spinner("Auto-indexing uploaded documents for chat..."):
-            docs = load_pdfs(uploaded_files)
+            # Only the difference between old and new upload sets is parsed / embedded
+            previous = set(st.session_state.uploaded_file_names)
+            removed = previous - set(current_names)
+            added_files = [f for f in uploaded_files if f.name not in previous]
+            kept_docs = [d for d in st.session_state.documents if d.name not in removed]
+            new_docs, new_chunks = ingest_uploads(config, added_files, known_hashes=[d.sha256 for d in kept_docs])
+            docs = kept_docs + new_docs
+            chunks = [c for c in st.session_state.chunks if c.document_name not in removed] + new_chunks
             st.session_state.documents = docs
-            chunks = chunk_documents(docs)
             st.session_state.chunks = chunks
-            if chunks:
-                embed = get_embedding_model(config)
-                manager = FaissStoreManager(config)
-                vs = manager.build_index(chunks, embed, force_rebuild=True)
-                st.session_state.vectorstore = vs
-                st.session_state.qa_chain = build_qa_chain(config, vs)
+            from src.vectorstore.faiss_store import FaissStoreManager
+            embed = get_embedding_model(config)
+            manager = FaissStoreManager(config, session_ns)
+            vs = st.session_state.vectorstore
+            if vs is None:
+                vs = manager.build_index(docs, chunks, embed) if chunks else None
+            else:
+                vs = manager.remove_documents(vs, removed)
+                vs = manager.add_documents(vs, new_docs, new_chunks, embed)
+            if not chunks:
+                vs = None
+            st.session_state.vectorstore = vs
+            sync_text_indexes(manager, docs, chunks, embed)
+            refresh_qa_chain()
             # Quick heuristic summaries (fast) so overview isn't empty
             if docs and chunks:
                 from src.summarize.summarizer import heuristic_document_summary
@@ -165,17 +204,18 @@ if uploaded_files:
             st.success("Chat ready. You can start asking questions now or run Full Analyze for deeper insights.")
 
 if process_clicked and uploaded_files:
-    with st.spinner("Loading PDFs..."):
-        docs = load_pdfs(uploaded_files)
+    with st.spinner("Loading & chunking PDFs..."):
+        docs, chunks = ingest_uploads(config, uploaded_files)
         st.session_state.documents = docs
-    with st.spinner("Chunking documents..."):
-        chunks = chunk_documents(docs)
         st.session_state.chunks = chunks
     with st.spinner("Embedding and indexing..."):
+        from src.vectorstore.faiss_store import FaissStoreManager
         embed = get_embedding_model(config)
-        manager = FaissStoreManager(config)
-        vs = manager.build_index(chunks, embed)
+        manager = FaissStoreManager(config, session_ns)
+        # The auto-index step keeps the session index in sync with uploads; only build when missing
+        vs = st.session_state.vectorstore or manager.build_index(docs, chunks, embed)
         st.session_state.vectorstore = vs
+        sync_text_indexes(manager, docs, chunks, embed)
     with st.spinner("Summarizing documents..."):
         summaries = summarize_documents(config, docs, chunks)
         st.session_state.summaries = summaries
@@ -184,7 +224,7 @@ if process_clicked and uploaded_files:
     with st.spinner("Detecting red flags..."):
         st.session_state.redflags = detect_redflags(config, st.session_state.clauses)
     with st.spinner("Preparing QA chain..."):
-        st.session_state.qa_chain = build_qa_chain(config, st.session_state.vectorstore)
+        refresh_qa_chain()
     st.success("Analysis complete.")
 
 # Removed manual rebuild button; index rebuild happens automatically on new upload or full analyze
@@ -239,8 +279,15 @@ with clauses_tab_ui:
 with redflags_tab_ui:
     redflags_tab(st.session_state.redflags, config)
 with qa_tab_ui:
-    qa_tab(config, st.session_state.qa_chain, st.session_state.qa_history)
+    qa_tab(
+        config, st.session_state.qa_chain, st.session_state.qa_history,
+        [d.name for d in st.session_state.documents], max((d.pages for d in st.session_state.documents), default=0),
+    )
 with report_tab_ui:
     report_tab(st.session_state)
 
 st.markdown("<div class='legal-footer'>Not legal advice. For informational purposes only.</div>", unsafe_allow_html=True)
+
+# UI is on screen: record cold-start paint time and (optionally) preload models in the background
+mark_first_paint(_SCRIPT_T0)
+start_warmup(config)
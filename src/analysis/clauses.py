@@ -2,8 +2,9 @@ from __future__ import annotations
 from typing import List
 from src.utils.types import Chunk, ClauseResult
 from src.utils.config import AppConfig
-from src.llm.gemini import GeminiClient
-from src.llm.fallback import LocalLLM
+from src.llm.dispatch import map_generate
+from src.llm.packing import pack_prompts
+from src.llm.registry import can_generate, get_llm
 import re
 
 CLAUSE_PROMPT_PATH = "src/prompts/clauses.txt"
@@ -21,14 +22,6 @@ IMPORTANCE_RULES = {
     "Late fees/penalties": "Medium",
 }
 
-def _get_llm(config: AppConfig):
-    if config.use_gemini:
-        try:
-            return GeminiClient(config)
-        except Exception:
-            return LocalLLM(config)
-    return LocalLLM(config)
-
 CLAUSE_LINE_RE = re.compile(r"^CLAUSE:(.*?)\|EXPLANATION:(.*?)\|SNIPPET:(.*?)\|PAGE:(\d+)$")
 
 
@@ -37,8 +30,8 @@ def extract_clauses(config: AppConfig, chunks: List[Chunk]) -> List[ClauseResult
 
     Heuristic mode triggers when LocalLLM has no underlying transformers pipeline (offline / deps missing).
     """
-    llm = _get_llm(config)
-    is_stub = isinstance(llm, LocalLLM) and getattr(llm, 'pipe', None) is None
+    llm = get_llm(config)
+    is_stub = not can_generate(llm)
     results: List[ClauseResult] = []
 
     if is_stub:  # heuristic extraction (improved scoring)
@@ -147,10 +140,11 @@ def extract_clauses(config: AppConfig, chunks: List[Chunk]) -> List[ClauseResult
                             ))
                             break
     else:  # LLM-driven extraction
-        for batch_start in range(0, len(chunks), 10):
-            batch = chunks[batch_start: batch_start + 10]
-            prompt = CLAUSE_TEMPLATE.format(text="\n\n".join(c.content for c in batch), target_clauses=", ".join(TARGET_CLAUSES))
-            raw = llm.generate(prompt)
+        targets = ", ".join(TARGET_CLAUSES)
+        prompts = pack_prompts(
+            config, llm, "clauses", lambda text: CLAUSE_TEMPLATE.format(text=text, target_clauses=targets), [c.content for c in chunks],
+        )
+        for raw in map_generate(config, llm, prompts):
             for line in raw.splitlines():
                 m = CLAUSE_LINE_RE.match(line.strip())
                 if not m:
@@ -2,8 +2,9 @@ from __future__ import annotations
 from typing import List
 from src.utils.types import ClauseResult, RedFlagResult
 from src.utils.config import AppConfig
-from src.llm.gemini import GeminiClient
-from src.llm.fallback import LocalLLM
+from src.llm.dispatch import map_generate
+from src.llm.packing import pack_prompts
+from src.llm.registry import can_generate, get_llm
 import re
 
 REDFLAG_PROMPT_PATH = "src/prompts/redflags.txt"
@@ -17,21 +18,13 @@ RISK_KEYWORDS = [
     (re.compile(r"liquidated damages", re.I), 15, "Penalties"),
 ]
 
-def _get_llm(config: AppConfig):
-    if config.use_gemini:
-        try:
-            return GeminiClient(config)
-        except Exception:
-            return LocalLLM(config)
-    return LocalLLM(config)
-
 LINE_RE = re.compile(r"^RISK:(.*?)\|REASON:(.*?)\|SNIPPET:(.*?)\|PAGE:(\d+)\|SCORE:(\d+)$")
 
 
 def detect_redflags(config: AppConfig, clauses: List[ClauseResult]) -> List[RedFlagResult]:
     """Detect red flags; if only stub LLM available, use heuristic scoring without prompt round-trip."""
-    llm = _get_llm(config)
-    is_stub = isinstance(llm, LocalLLM) and getattr(llm, 'pipe', None) is None
+    llm = get_llm(config)
+    is_stub = not can_generate(llm)
     results: List[RedFlagResult] = []
 
     if is_stub:  # pure heuristic mode
@@ -53,17 +46,15 @@ def detect_redflags(config: AppConfig, clauses: List[ClauseResult]) -> List[RedF
                 confidence=float(min(base_score, 95)),
             ))
     else:
-        for batch_start in range(0, len(clauses), 12):
-            batch = clauses[batch_start: batch_start + 12]
-            heuristic_lines = []
-            for c in batch:
-                base_score = 30
-                for pattern, add, reason in RISK_KEYWORDS:
-                    if pattern.search(c.snippet):
-                        base_score += add
-                heuristic_lines.append(f"CLAUSE:{c.clause_type}|SNIPPET:{c.snippet}|PAGE:{c.page}|BASE:{base_score}")
-            prompt = REDFLAG_TEMPLATE.format(clauses="\n".join(heuristic_lines))
-            raw = llm.generate(prompt)
+        heuristic_lines = []
+        for c in clauses:
+            base_score = 30
+            for pattern, add, reason in RISK_KEYWORDS:
+                if pattern.search(c.snippet):
+                    base_score += add
+            heuristic_lines.append(f"CLAUSE:{c.clause_type}|SNIPPET:{c.snippet}|PAGE:{c.page}|BASE:{base_score}")
+        prompts = pack_prompts(config, llm, "redflags", lambda text: REDFLAG_TEMPLATE.format(clauses=text), heuristic_lines, sep="\n")
+        for raw in map_generate(config, llm, prompts):
             for line in raw.splitlines():
                 m = LINE_RE.match(line.strip())
                 if not m:
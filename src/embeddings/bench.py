@@ -0,0 +1,186 @@
+"""Embedding micro-benchmarks (manual use, not part of the app).
+
+    python -m src.embeddings.bench hashing [n_chunks]
+    python -m src.embeddings.bench recall [model_name]
+
+`hashing` compares the previous per-text SHA-1 HashingEmbedding loop against the
+vectorized batch implementation on a synthetic contract-like corpus (default 10k
+chunks of ~1,100 characters, matching chunk_documents).
+
+`recall` reports recall@5 of the int8 quantized backend against the fp32
+sentence-transformer (top-5 neighbours of each fixture question) plus encode
+throughput of both.
+"""
+from __future__ import annotations
+import hashlib
+import math
+import random
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from src.embeddings.embeddings import HashingEmbedding
+
+_VOCAB = (
+    "agreement party parties customer supplier service services term termination terminate notice days "
+    "payment fee fees invoice payable liability liable indemnify indemnification damages confidential "
+    "information intellectual property license warranty disclaimer governing law jurisdiction court "
+    "arbitration renewal automatic renew breach material obligation shall may must not any all the of "
+    "to and in for with by under this such written consent data personal processing controller processor"
+).split()
+
+
+# Local recall fixture: short clauses in the style of SaaS / services agreements
+FIXTURE_CLAUSES = [
+    "Either party may terminate this Agreement for convenience upon ninety (90) days written notice.",
+    "Customer may terminate immediately if Supplier commits a material breach that remains uncured for thirty days.",
+    "This Agreement renews automatically for successive one-year terms unless either party gives notice of non-renewal.",
+    "Fees are payable within thirty (30) days of the invoice date.",
+    "Late payments accrue interest at 1.5% per month or the maximum rate permitted by law.",
+    "All fees are exclusive of taxes, which are the responsibility of the Customer.",
+    "Supplier may increase the subscription fees once per year with sixty days prior notice.",
+    "Each party shall keep the other party's Confidential Information secret and use it only to perform this Agreement.",
+    "Confidentiality obligations survive termination of this Agreement for five years.",
+    "Supplier retains all intellectual property rights in the Services and the Software.",
+    "Customer grants Supplier a limited license to use Customer Data solely to provide the Services.",
+    "Neither party's aggregate liability shall exceed the fees paid in the twelve months preceding the claim.",
+    "Neither party is liable for indirect, incidental or consequential damages, including lost profits.",
+    "Supplier shall indemnify Customer against any third-party claim that the Services infringe intellectual property rights.",
+    "Customer shall indemnify and hold harmless Supplier from all claims arising from Customer Data.",
+    "This Agreement is governed by the laws of England and Wales.",
+    "The courts of London have exclusive jurisdiction over any dispute arising from this Agreement.",
+    "Any dispute shall be finally resolved by binding arbitration under the ICC Rules.",
+    "Supplier shall process personal data only on documented instructions from the Customer as controller.",
+    "Supplier shall notify Customer of a personal data breach without undue delay and within 48 hours.",
+    "Supplier warrants that the Services will perform materially in accordance with the Documentation.",
+    "Except as expressly stated, the Services are provided as is and all other warranties are disclaimed.",
+    "Supplier will make the Services available 99.9% of the time, measured monthly, excluding scheduled maintenance.",
+    "Service credits are the Customer's sole and exclusive remedy for failure to meet the service levels.",
+    "Supplier may suspend access to the Services if any invoice is more than thirty days overdue.",
+    "Customer may not assign this Agreement without Supplier's prior written consent.",
+    "Supplier may subcontract its obligations provided it remains responsible for its subcontractors.",
+    "Neither party is liable for delay caused by events beyond its reasonable control, including natural disasters.",
+    "Customer may audit Supplier's compliance with this Agreement once per year on thirty days notice.",
+    "Supplier may modify the Services at its sole discretion provided functionality is not materially reduced.",
+    "Liquidated damages of 0.5% of the contract value apply for each week of delay.",
+    "Upon termination Customer may export its data for thirty days, after which Supplier will delete it.",
+    "Notices must be in writing and delivered by hand, courier or email to the addresses set out above.",
+    "This Agreement constitutes the entire agreement between the parties and supersedes all prior agreements.",
+    "Beta services are provided free of charge, without support and may be discontinued at any time.",
+    "Supplier shall maintain insurance coverage of at least five million dollars for professional liability.",
+    "Customer shall not reverse engineer, decompile or copy the Software.",
+    "Each party shall comply with applicable anti-bribery and export control laws.",
+    "A waiver of any breach is not a waiver of any other breach.",
+    "If any provision is held invalid, the remaining provisions remain in full force and effect.",
+]
+
+FIXTURE_QUESTIONS = [
+    "Can I terminate early?",
+    "When do invoices have to be paid?",
+    "What happens if I pay late?",
+    "Does the contract renew automatically?",
+    "Who owns the intellectual property?",
+    "Is there a cap on liability?",
+    "Who has to indemnify whom?",
+    "Which law governs the contract?",
+    "How are disputes resolved?",
+    "What are the data protection obligations?",
+    "What uptime is guaranteed?",
+    "Can the supplier raise prices?",
+    "What happens to my data after termination?",
+    "Are there penalties for delay?",
+    "Can the supplier change the service?",
+]
+
+
+def recall_at_k(reference: np.ndarray, candidate: np.ndarray, query_ref: np.ndarray, query_cand: np.ndarray, k: int = 5) -> float:
+    """Mean overlap of candidate top-k with reference top-k (cosine similarity)."""
+    def _topk(docs: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        d = docs / np.linalg.norm(docs, axis=1, keepdims=True)
+        q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        return np.argsort(-(q @ d.T), axis=1)[:, :k]
+    ref, cand = _topk(reference, query_ref), _topk(candidate, query_cand)
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref, cand)]))
+
+
+def bench_quantized_recall(model_name: str = "intfloat/e5-small-v2", k: int = 5) -> Dict[str, float]:
+    from src.embeddings.quantized import QuantizedSentenceEmbedding
+    fp32 = QuantizedSentenceEmbedding(model_name, quantize=False)
+    int8 = QuantizedSentenceEmbedding(model_name, quantize=True)
+    d32, q32 = fp32.embed_matrix(FIXTURE_CLAUSES), fp32.embed_matrix(FIXTURE_QUESTIONS)
+    d8, q8 = int8.embed_matrix(FIXTURE_CLAUSES), int8.embed_matrix(FIXTURE_QUESTIONS)
+    corpus = synthetic_corpus(256)
+    return {
+        f"recall@{k}": recall_at_k(d32, d8, q32, q8, k),
+        "fp32_chunks_per_sec": _throughput(fp32.embed_matrix, corpus, repeats=1),
+        "int8_chunks_per_sec": _throughput(int8.embed_matrix, corpus, repeats=1),
+    }
+
+
+def synthetic_corpus(n_chunks: int = 10_000, chunk_chars: int = 1100, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n_chunks):
+        words: List[str] = []
+        size = 0
+        while size < chunk_chars:
+            w = rng.choice(_VOCAB)
+            if rng.random() < 0.15:  # sprinkle capitalisation / numbering like real clauses
+                w = w.capitalize() + rng.choice(["", ".", ",", f" {rng.randint(1, 30)}."])
+            words.append(w)
+            size += len(w) + 1
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def legacy_hashing_vectorize(text: str, dim: int = 384) -> List[float]:
+    """Reference copy of the pre-vectorization HashingEmbedding._vectorize (SHA-1 per token)."""
+    vec = [0.0] * dim
+    tokens = [t for t in text.lower().split() if t]
+    if not tokens:
+        return vec
+    for tok in tokens:
+        h = int(hashlib.sha1(tok.encode()).hexdigest(), 16)
+        vec[h % dim] += 1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _throughput(fn: Callable[[List[str]], object], corpus: List[str], repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(corpus)
+        best = min(best, time.perf_counter() - t0)
+    return len(corpus) / best
+
+
+def bench_hashing(n_chunks: int = 10_000) -> Dict[str, float]:
+    corpus = synthetic_corpus(n_chunks)
+    results = {"legacy_sha1_loop": _throughput(lambda c: [legacy_hashing_vectorize(t) for t in c], corpus, repeats=1)}
+    for label, emb in (
+        ("vectorized", HashingEmbedding()),
+        ("vectorized_signed", HashingEmbedding(signed=True)),
+        ("vectorized_signed_bigrams", HashingEmbedding(signed=True, bigrams=True)),
+    ):
+        results[label] = _throughput(emb.embed_matrix, corpus)
+    return results
+
+
+if __name__ == "__main__":  # Manual invocation helper
+    import sys
+    mode = sys.argv[1] if len(sys.argv) > 1 else "hashing"
+    if mode == "hashing":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+        res = bench_hashing(n)
+        base = res["legacy_sha1_loop"]
+        print(f"HashingEmbedding throughput on {n} synthetic chunks (chunks/sec):")
+        for label, cps in res.items():
+            print(f"  {label:<28} {cps:>12,.0f}  ({cps / base:5.1f}x)")
+    elif mode == "recall":
+        model = sys.argv[2] if len(sys.argv) > 2 else "intfloat/e5-small-v2"
+        res = bench_quantized_recall(model)
+        print(f"Quantized (int8) vs fp32 {model} on {len(FIXTURE_QUESTIONS)} fixture questions / {len(FIXTURE_CLAUSES)} clauses:")
+        for label, value in res.items():
+            print(f"  {label:<22} {value:>10,.3f}")
+    else:
+        sys.exit(f"unknown mode: {mode}")
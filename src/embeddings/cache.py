@@ -0,0 +1,124 @@
+"""Persistent embedding cache.
+
+`CachedEmbeddings` wraps any LangChain `Embeddings` and stores document vectors
+in a local SQLite file keyed by (model name, hash of whitespace-normalized text).
+Vectors are kept as compact float16 / float32 blobs; only cache misses are sent
+to the underlying model, in one batch. Re-indexing an already-seen contract is
+therefore embedding-free. Size is capped with least-recently-used eviction.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.utils.logging import logger
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WS_RE.sub(" ", text).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, base: Embeddings, model_name: str, path: str, max_bytes: int, dtype: str = "float16"):
+        self.base = base
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vec BLOB NOT NULL, dtype TEXT NOT NULL, nbytes INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return self.model_name + ":" + hashlib.sha1(_normalize(text).encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        uniq = list(dict.fromkeys(keys))
+        for i in range(0, len(uniq), 500):  # stay below SQLite's variable limit
+            part = uniq[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vec, dtype FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for key, blob, dtype in rows:
+                found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+        if found:
+            now = time.time()
+            self._conn.executemany("UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k in found])
+        return found
+
+    def _store(self, items: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        rows = []
+        for key, vec in items.items():
+            blob = np.asarray(vec, dtype=self.dtype).tobytes()
+            rows.append((key, blob, self.dtype.name, len(blob), now))
+        self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+        self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used"):
+            doomed.append((key,))
+            excess -= nbytes
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key=?", doomed)
+        self.stats["evictions"] += len(doomed)
+
+    def embed_documents(self, texts):  # type: ignore[override]
+        if not texts:
+            return []
+        keys = [self._key(t) for t in texts]
+        with self._lock:
+            try:
+                found = self._lookup(keys)
+                self._conn.commit()
+            except sqlite3.Error as e:  # cache is best-effort; never block indexing
+                logger.warning("Embedding cache read failed: %s", e)
+                found = {}
+        miss_keys: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in miss_keys:
+                miss_keys[key] = text
+        n_missing = sum(1 for k in keys if k not in found)
+        self.stats["hits"] += len(texts) - n_missing
+        self.stats["misses"] += n_missing
+        if miss_keys:
+            # embed_matrix (array out) skips the List[List[float]] round trip of embed_documents
+            embed = getattr(self.base, "embed_matrix", None) or self.base.embed_documents
+            vectors = embed(list(miss_keys.values()))
+            fresh = {key: np.asarray(vec, dtype=np.float32) for key, vec in zip(miss_keys, vectors)}
+            found.update(fresh)
+            with self._lock:
+                try:
+                    self._store(fresh)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning("Embedding cache write failed: %s", e)
+        return [found[k].tolist() for k in keys]
+
+    def embed_query(self, text):  # type: ignore[override]
+        return self.base.embed_query(text)
+
+    def embed_queries(self, texts):
+        from src.embeddings.embeddings import embed_queries
+        return embed_queries(self.base, texts)
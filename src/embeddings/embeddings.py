@@ -1,21 +1,47 @@
 from __future__ import annotations
-from __future__ import annotations
 from src.utils.config import AppConfig
+from src.utils.logging import logger
 from functools import lru_cache
+from typing import List, NamedTuple
 import os
-import math
-import hashlib
+import numpy as np
 from langchain_core.embeddings import Embeddings
 
-try:  # attempt light import; may fail on some Windows envs
-    from langchain_huggingface import HuggingFaceEmbeddings  # type: ignore
-    _HF_NEW = True
-except Exception:  # pragma: no cover
-    try:
-        from langchain_community.embeddings import HuggingFaceEmbeddings  # type: ignore
-        _HF_NEW = False
+
+def _hf_embeddings_cls():
+    """Import HuggingFaceEmbeddings on first use (pulls in sentence-transformers / torch)."""
+    try:  # attempt light import; may fail on some Windows envs
+        from langchain_huggingface import HuggingFaceEmbeddings  # type: ignore
     except Exception:  # pragma: no cover
-        HuggingFaceEmbeddings = None  # type: ignore
+        try:
+            from langchain_community.embeddings import HuggingFaceEmbeddings  # type: ignore
+        except Exception:  # pragma: no cover
+            return None
+    return HuggingFaceEmbeddings
+
+
+# FNV-1a (32 bit): fast, non-cryptographic and stable across processes (unlike hash())
+_FNV_OFFSET = np.uint32(2166136261)
+_FNV_PRIME = np.uint32(16777619)
+_BIGRAM_MIX = np.uint32(0x9E3779B1)
+# ASCII whitespace lookup table matching str.split() for the bytes we see after PDF cleaning
+_WS_LUT = np.zeros(256, dtype=bool)
+_WS_LUT[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+
+def _fnv1a_spans(buf: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Hash every byte span buf[start:start+length] at once, one vectorized step per byte column."""
+    order = np.argsort(-lengths, kind="stable")  # longest first => active spans are a prefix
+    s_starts = starts[order]
+    s_lengths = lengths[order]
+    h = np.full(len(starts), _FNV_OFFSET, dtype=np.uint32)
+    # number of spans still active at byte position j
+    active_counts = np.searchsorted(-s_lengths, -np.arange(int(s_lengths[0]) if len(s_lengths) else 0), side="left")
+    for j, n_active in enumerate(active_counts):
+        h[:n_active] = (h[:n_active] ^ buf[s_starts[:n_active] + j]) * _FNV_PRIME
+    out = np.empty_like(h)
+    out[order] = h
+    return out
 
 
 class HashingEmbedding(Embeddings):
@@ -23,40 +49,130 @@ class HashingEmbedding(Embeddings):
 
     Produces deterministic vectors without external ML deps; supports FAISS similarity.
     Not semantic; only for degraded mode when HF models unavailable.
+
+    A whole batch is tokenized and hashed with NumPy (FNV-1a over the UTF-8 bytes) and
+    scattered into a dense float32 matrix with one bincount. `signed` uses one hash bit
+    as the sign (reduces collision bias); `bigrams` also hashes adjacent token pairs.
+    `embed_matrix` returns that (n, dim) array for internal batch paths; `embed_documents`
+    keeps the LangChain List[List[float]] contract.
     """
 
-    def __init__(self, dim: int = 384):
+    def __init__(self, dim: int = 384, signed: bool = False, bigrams: bool = False):
         self.dim = dim
+        self.signed = signed
+        self.bigrams = bigrams
+        # cache key namespace (vectors differ per variant)
+        self.model_name = f"hashing-v2-{dim}" + ("-signed" if signed else "") + ("-bigrams" if bigrams else "")
+
+    def _token_hashes(self, texts):
+        """Return (row index, hash) for every token (and bigram) of every text."""
+        parts = [t.lower().encode("utf-8") for t in texts]
+        buf = np.frombuffer(b"\n".join(parts), dtype=np.uint8)
+        if not len(buf):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+        word = ~_WS_LUT[buf]
+        edges = np.diff(np.concatenate(([False], word, [False])).astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        # text i occupies bytes [text_starts[i], text_starts[i+1] - 1)
+        text_ends = np.cumsum([len(p) + 1 for p in parts])
+        rows = np.searchsorted(text_ends, starts, side="right")
+        hashes = _fnv1a_spans(buf, starts, ends - starts)
+        if self.bigrams and len(hashes) > 1:
+            same_row = rows[1:] == rows[:-1]
+            pair = (hashes[:-1][same_row] * _BIGRAM_MIX ^ hashes[1:][same_row]) * _FNV_PRIME
+            rows = np.concatenate((rows, rows[:-1][same_row]))
+            hashes = np.concatenate((hashes, pair))
+        return rows, hashes
 
-    def _vectorize(self, text: str):
-        vec = [0.0] * self.dim
-        tokens = [t for t in text.lower().split() if t]
-        if not tokens:
-            return vec
-        for tok in tokens:
-            h = int(hashlib.sha1(tok.encode()).hexdigest(), 16)
-            idx = h % self.dim
-            vec[idx] += 1.0
-        # l2 normalize
-        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
-        return [v / norm for v in vec]
+    def embed_matrix(self, texts) -> np.ndarray:
+        texts = list(texts)
+        n = len(texts)
+        rows, hashes = self._token_hashes(texts)
+        cols = (hashes % np.uint32(self.dim)).astype(np.int64)
+        weights = None
+        if self.signed:
+            weights = 1.0 - 2.0 * (hashes >> np.uint32(31)).astype(np.float64)
+        flat = np.bincount(rows * self.dim + cols, weights=weights, minlength=n * self.dim)
+        mat = flat.reshape(n, self.dim).astype(np.float32)
+        # l2 normalize (empty texts stay all-zero)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        mat /= norms
+        return np.ascontiguousarray(mat)
 
     def embed_documents(self, texts):  # type: ignore[override]
-        return [self._vectorize(t) for t in texts]
+        return self.embed_matrix(texts).tolist()
 
     def embed_query(self, text):  # type: ignore[override]
-        return self._vectorize(text)
+        return self.embed_matrix([text])[0].tolist()
+
+    def embed_queries(self, texts) -> np.ndarray:
+        """Batched embed_query (no query-side transform for hashed vectors)."""
+        return self.embed_matrix(texts)
+
+
+class _EmbedSpec(NamedTuple):
+    """Hashable embedding selection (lru_cache key)."""
+    model_name: str
+    backend: str = "hf"
+    batch_size: int = 32
+    threads: int = 0
+    hash_signed: bool = False
+    hash_bigrams: bool = False
+
+
+def _embed_spec(config: AppConfig) -> _EmbedSpec:
+    return _EmbedSpec(
+        config.embed_model, config.embed_backend, config.embed_batch_size, config.embed_threads,
+        config.hash_embed_signed, config.hash_embed_bigrams,
+    )
 
 
 @lru_cache(maxsize=4)
-def _load_embedding(model_name: str):  # pragma: no cover (cache wrapper)
-    if os.getenv("DISABLE_HF_EMBED", "false").lower() == "true" or HuggingFaceEmbeddings is None:
-        return HashingEmbedding()
+def _load_embedding(spec: _EmbedSpec):  # pragma: no cover (cache wrapper)
+    hashing = HashingEmbedding(signed=spec.hash_signed, bigrams=spec.hash_bigrams)
+    if os.getenv("DISABLE_HF_EMBED", "false").lower() == "true":
+        return hashing
+    if spec.backend == "quantized":
+        try:
+            from src.embeddings.quantized import QuantizedSentenceEmbedding
+            return QuantizedSentenceEmbedding(spec.model_name, batch_size=spec.batch_size, threads=spec.threads)
+        except Exception as e:
+            logger.warning("Quantized embedding backend unavailable (%s); using default backend", e)
+    HuggingFaceEmbeddings = _hf_embeddings_cls()
+    if HuggingFaceEmbeddings is None:
+        return hashing
     try:
-        return HuggingFaceEmbeddings(model_name=model_name)
+        return HuggingFaceEmbeddings(model_name=spec.model_name, encode_kwargs={"batch_size": spec.batch_size})
     except Exception:
-        return HashingEmbedding()
+        return hashing
+
+
+def embed_queries(embed, texts: List[str]):
+    """Query-side vectors for several questions: `embed.embed_queries` when the backend batches
+    them, else embed_query per text (which applies query instructions / prefixes, e.g. bge)."""
+    batch = getattr(embed, "embed_queries", None)
+    if batch is not None:
+        return batch(texts)
+    return [embed.embed_query(t) for t in texts]
+
+
+def embedding_tag(embed) -> str:
+    """Identify the vector space an Embeddings instance produces (cache / shard namespace)."""
+    return getattr(embed, "model_name", None) or type(embed).__name__
+
+
+@lru_cache(maxsize=4)
+def _load_cached_embedding(spec: _EmbedSpec, workspace_dir: str, cache_mb: int, dtype: str):  # pragma: no cover (cache wrapper)
+    from src.embeddings.cache import CachedEmbeddings
+    base = _load_embedding(spec)
+    path = os.path.join(workspace_dir, "embed_cache.sqlite")
+    return CachedEmbeddings(base, embedding_tag(base), path, cache_mb * 1024 * 1024, dtype=dtype)
 
 
 def get_embedding_model(config: AppConfig):
-    return _load_embedding(config.embed_model)
+    spec = _embed_spec(config)
+    if config.embed_cache_mb <= 0:
+        return _load_embedding(spec)
+    return _load_cached_embedding(spec, config.workspace_dir, config.embed_cache_mb, config.embed_cache_dtype)
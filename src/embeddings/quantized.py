@@ -0,0 +1,53 @@
+"""CPU-optimized sentence-transformer backend (EMBED_BACKEND=quantized).
+
+Applies PyTorch dynamic int8 quantization to the Linear layers of the model,
+pins the intra-op thread count and encodes length-sorted batches so each batch
+pads to similar lengths. Vectors are not comparable with the fp32 model, so
+the cache namespace carries an "-int8" suffix. `embed_matrix` returns the
+batch as an (n, dim) array for internal batch paths; `embed_documents` keeps
+the LangChain List[List[float]] contract.
+"""
+from __future__ import annotations
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class QuantizedSentenceEmbedding(Embeddings):
+    def __init__(self, model_name: str, batch_size: int = 32, threads: int = 0, quantize: bool = True):
+        import torch  # heavy; only imported when this backend is selected
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self._torch = torch
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.model_name = f"{model_name}-int8" if quantize else model_name
+
+    def embed_matrix(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Longest first: every batch holds similar lengths, so little padding is wasted
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        out = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        with self._torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                vecs = self.model.encode([texts[i] for i in idx], batch_size=len(idx), convert_to_numpy=True, show_progress_bar=False)
+                out[idx] = vecs
+        return out
+
+    def embed_documents(self, texts):  # type: ignore[override]
+        return self.embed_matrix(texts).tolist()
+
+    def embed_query(self, text):  # type: ignore[override]
+        return self.embed_matrix([text])[0].tolist()
+
+    def embed_queries(self, texts) -> np.ndarray:
+        """Batched embed_query (this backend encodes queries and documents alike)."""
+        return self.embed_matrix(texts)
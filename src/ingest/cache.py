@@ -0,0 +1,179 @@
+"""Content-addressed on-disk cache for parsed PDFs.
+
+Entries are keyed by the SHA-256 of the PDF bytes plus the extractor / chunker
+version, so re-uploading a file (under any name) or re-running Full Analyze
+skips PDF parsing and chunking entirely. Each entry is one JSON file holding
+the Document (including pages_text) and its chunks; file mtime doubles as the
+LRU clock for size-capped eviction.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.ingest.chunker import chunk_documents
+from src.ingest.pdf_loader import EXTRACTOR_VERSION, load_pdfs
+from src.utils.config import AppConfig
+from src.utils.logging import logger
+from src.utils.types import Chunk, Document
+
+# Bump when chunk_documents output changes
+CHUNKER_VERSION = "1"
+
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _bump(counter: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[counter] += n
+
+
+class _BytesUpload:
+    """Minimal stand-in for a Streamlit UploadedFile (name + read())."""
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+
+class IngestCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.version_tag = hashlib.sha1(f"{EXTRACTOR_VERSION}|{CHUNKER_VERSION}".encode()).hexdigest()[:8]
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}-{self.version_tag}.json")
+
+    def get(self, digest: str) -> Optional[Tuple[Document, List[Chunk]]]:
+        path = self._path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            _bump("misses")
+            return None
+        _bump("hits")
+        doc = Document(**payload["document"])
+        chunks = [Chunk(**c) for c in payload["chunks"]]
+        return doc, chunks
+
+    def put(self, digest: str, doc: Document, chunks: List[Chunk]) -> None:
+        path = self._path(digest)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        payload = {"document": asdict(doc), "chunks": [asdict(c) for c in chunks]}
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:  # cache is best-effort
+            logger.warning("Ingest cache write failed for %s: %s", doc.name, e)
+            return
+        self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        out = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits max_bytes."""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                _bump("evictions")
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries()
+        with _STATS_LOCK:
+            snapshot = dict(_STATS)
+        snapshot.update(entries=len(entries), bytes=sum(size for _, size, _ in entries))
+        return snapshot
+
+
+_CACHES: Dict[Tuple[str, int], IngestCache] = {}
+
+
+def get_ingest_cache(config: AppConfig) -> Optional[IngestCache]:
+    if config.ingest_cache_mb <= 0:
+        return None
+    key = (config.workspace_dir, config.ingest_cache_mb)
+    if key not in _CACHES:
+        _CACHES[key] = IngestCache(os.path.join(config.workspace_dir, "ingest_cache"), config.ingest_cache_mb * 1024 * 1024)
+    return _CACHES[key]
+
+
+def ingest_cache_stats() -> Dict[str, int]:
+    """Process-wide hit / miss / eviction counters (for sidebar & logs)."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def ingest_uploads(config: AppConfig, uploaded_files, known_hashes: Iterable[str] = ()) -> Tuple[List[Document], List[Chunk]]:
+    """Parse + chunk uploads, serving already-seen PDFs from the ingestion cache.
+
+    Returned documents keep the upload order and the current upload names. Files with identical
+    content are ingested once (the later duplicate is skipped), as are files whose hash is in
+    known_hashes (content already present in the workspace).
+    """
+    cache = get_ingest_cache(config)
+    slots: List[Optional[Tuple[Document, List[Chunk]]]] = []
+    misses: List[Tuple[int, str, bytes]] = []
+    seen: Dict[str, str] = {h: "an earlier upload" for h in known_hashes}
+    for f in uploaded_files:
+        data = f.getvalue() if hasattr(f, "getvalue") else f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in seen:
+            logger.info("Skipping %s: identical content already uploaded as %s", f.name, seen[digest])
+            continue
+        seen[digest] = f.name
+        hit = cache.get(digest) if cache else None
+        if hit:
+            doc, chunks = hit
+            doc = replace(doc, name=f.name)
+            chunks = [replace(c, document_name=f.name) for c in chunks]
+            slots.append((doc, chunks))
+        else:
+            misses.append((len(slots), f.name, data))
+            slots.append(None)
+
+    if misses:
+        parsed = load_pdfs([_BytesUpload(name, data) for _, name, data in misses], workers=config.pdf_workers)
+        for (slot, _, _), doc in zip(misses, parsed):
+            chunks = chunk_documents([doc])
+            if cache and doc.pages:  # unreadable PDFs are not cached (may be transient)
+                cache.put(doc.sha256, doc, chunks)
+            slots[slot] = (doc, chunks)
+    if cache:
+        logger.info("Ingest cache: %d hit(s), %d miss(es) this call; totals %s", len(slots) - len(misses), len(misses), ingest_cache_stats())
+
+    docs = [doc for doc, _ in slots]
+    chunks = [c for _, doc_chunks in slots for c in doc_chunks]
+    return docs, chunks
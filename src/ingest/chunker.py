@@ -43,7 +43,8 @@ def chunk_documents(documents: List[Document], chunk_size: int = 1100, chunk_ove
         doc_splits = splitter.split_text(full)
         cursor = 0
         for i, text in enumerate(doc_splits):
-            digest = hashlib.sha1(f"{doc.name}-{i}".encode()).hexdigest()[:12]
+            # Content-derived ids stay stable when the same PDF is re-uploaded under another name
+            digest = hashlib.sha1(f"{doc.sha256 or doc.name}-{i}".encode()).hexdigest()[:12]
             # Determine page: majority vote of first 200 chars indices
             sample_range = range(cursor, min(cursor+len(text), cursor+200, len(page_map)))
             pages = {}
@@ -1,8 +1,14 @@
 from __future__ import annotations
-from typing import List
+from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 import io
+import math
+import multiprocessing
 import re
+import threading
 from src.utils.types import Document
+from src.utils.logging import logger
 
 try:  # primary fast lib
     from pypdf import PdfReader  # type: ignore
@@ -17,48 +23,115 @@ except Exception:  # pragma: no cover
 
 WHITESPACE_RE = re.compile(r"\s+")
 
+# Bump when extraction output changes so content-addressed caches are invalidated
+EXTRACTOR_VERSION = f"{_PDF_IMPL}-2"
+
+# Below this many pages in total a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 16
+# Smallest page range handed to a single worker task (each task re-parses the PDF xref)
+MIN_PAGES_PER_TASK = 8
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
 def clean_text(text: str) -> str:
     text = text.replace("\x00", " ")
     text = WHITESPACE_RE.sub(" ", text)
     return text.strip()
 
-def load_pdfs(uploaded_files) -> List[Document]:
+
+def _extract_page(page) -> str:
+    txt = ""
+    try:
+        txt = page.extract_text() or ""
+    except Exception:
+        txt = ""
+    # Very short pages used to be extracted a second time to merge line fragments; clean_text already
+    # collapses newlines of this single extraction, so the result is reused as-is.
+    return clean_text(txt)
+
+
+def _extract_page_range(data: bytes, start: int, stop: int) -> List[str]:
+    """Worker entry point: extract pages [start, stop) from raw PDF bytes."""
+    reader = PdfReader(io.BytesIO(data))
+    return [_extract_page(reader.pages[idx]) for idx in range(start, stop)]
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return a process pool shared across Streamlit reruns (spawn avoids forking a threaded server)."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def _page_ranges(n_pages: int, workers: int) -> List[Tuple[int, int]]:
+    step = max(MIN_PAGES_PER_TASK, math.ceil(n_pages / workers))
+    return [(start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+
+
+def _extract_parallel(sources: List[Tuple[str, bytes, int]], workers: int) -> List[List[str]]:
+    """Split every file into page ranges, run them all through one pool and reassemble in page order."""
+    pool = _get_pool(workers)
+    futures = []
+    for file_idx, (_, data, n_pages) in enumerate(sources):
+        for start, stop in _page_ranges(n_pages, workers):
+            futures.append((file_idx, start, pool.submit(_extract_page_range, data, start, stop)))
+    pages_by_file: List[List[str]] = [[""] * n for _, _, n in sources]
+    for file_idx, start, fut in futures:
+        texts = fut.result()
+        pages_by_file[file_idx][start:start + len(texts)] = texts
+    return pages_by_file
+
+
+def load_pdfs(uploaded_files, workers: int = 1) -> List[Document]:
     """Load PDFs with resilient text extraction.
 
     Strategy:
       1. Try standard extract_text per page.
       2. If page yields little/no text but has many characters in raw / or looks scanned, mark for optional OCR (placeholder).
       3. Concatenate cleaned text. Store per-page count for downstream heuristics.
+
+    With workers > 1 (and enough pages overall) page ranges of every file are extracted in a shared
+    process pool; pages_text is reassembled in original order so output is identical to the serial path.
     """
     documents: List[Document] = []
+    # (slot in documents, name, data, reader, page count, sha256) for files that opened successfully
+    opened = []
     for f in uploaded_files:
         data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
         if not PdfReader:  # hard failure fallback
-            documents.append(Document(name=f.name, text="", pages=0))
+            documents.append(Document(name=f.name, text="", pages=0, sha256=digest))
             continue
         try:
             reader = PdfReader(io.BytesIO(data))
+            n_pages = len(reader.pages)
         except Exception:
-            documents.append(Document(name=f.name, text="", pages=0))
+            documents.append(Document(name=f.name, text="", pages=0, sha256=digest))
             continue
-        pages_text: List[str] = []
-        for idx, page in enumerate(reader.pages):
-            txt = ""
-            try:
-                txt = page.extract_text() or ""
-            except Exception:
-                txt = ""
-            # Heuristic: if extremely short, maybe layout issue => try layout-based merge of extracted content objects
-            if len(txt.strip()) < 15:
-                # Attempt access to raw / objects (best-effort; if fails, ignore)
-                try:  # pragma: no cover - depends on underlying parser
-                    raw = " ".join(str(o) for o in page.extract_text().split("\n")) if hasattr(page, 'extract_text') else ''
-                    if len(raw) > len(txt):
-                        txt = raw
-                except Exception:
-                    pass
-            pages_text.append(clean_text(txt))
+        opened.append((len(documents), f.name, data, reader, n_pages, digest))
+        documents.append(None)  # type: ignore[arg-type]  # filled below
+
+    total_pages = sum(o[4] for o in opened)
+    pages_by_file = None
+    if workers > 1 and total_pages >= PARALLEL_MIN_PAGES:
+        try:
+            pages_by_file = _extract_parallel([(name, data, n) for _, name, data, _, n, _ in opened], workers)
+        except Exception as e:  # broken pool / pickling issue => serial path below
+            logger.warning("Parallel PDF extraction failed (%s); falling back to serial", e)
+            pages_by_file = None
+    if pages_by_file is None:
+        pages_by_file = [[_extract_page(page) for page in reader.pages] for _, _, _, reader, _, _ in opened]
+
+    for (slot, name, _, _, _, digest), pages_text in zip(opened, pages_by_file):
         # Combine per-file (bug fix: this was previously outside the loop causing only last file kept)
         combined = "\n".join(p for p in pages_text if p)
-        documents.append(Document(name=f.name, text=combined, pages=len(pages_text), pages_text=pages_text))
+        documents[slot] = Document(name=name, text=combined, pages=len(pages_text), pages_text=pages_text, sha256=digest)
     return documents
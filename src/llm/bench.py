@@ -0,0 +1,100 @@
+"""Concurrency load test against a local stand-in LLM server (manual use, not part of the app).
+
+    python -m src.llm.bench [n_requests] [latency_ms] [concurrency ...]
+
+Starts a loopback TCP server that answers each request after `latency_ms`
+(simulated network / provider time, no CPU), then sends `n_requests` prompts
+at each concurrency level (default: 8 and n_requests), the same number of
+requests in flight for both modes:
+
+* sync:  blocking `generate` calls from a pool of `concurrency` threads (how
+  Streamlit script threads call the LLM today)
+* async: `agenerate` on the shared src.utils.aio loop thread, with at most
+  `concurrency` in flight
+
+and reports wall time, requests/s and the threads each mode needed. At equal
+concurrency the throughput is the same; async reaches it with one loop thread
+instead of one thread per request in flight.
+"""
+from __future__ import annotations
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Sequence, Tuple
+from src.utils import aio
+
+
+def start_stand_in_server(latency_ms: float) -> Tuple[str, int]:
+    """Line protocol: read one prompt line, sleep, reply with one line. Runs on its own loop thread."""
+    ready = threading.Event()
+    address: Dict[str, Tuple[str, int]] = {}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        prompt = (await reader.readline()).decode("utf-8").strip()
+        await asyncio.sleep(latency_ms / 1000)
+        writer.write(f"stand-in answer to: {prompt[:60]}\n".encode("utf-8"))
+        await writer.drain()
+        writer.close()
+
+    async def serve() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024)
+        address["addr"] = server.sockets[0].getsockname()[:2]
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), name="stand-in-llm", daemon=True).start()
+    ready.wait()
+    return address["addr"]
+
+
+class StandInClient:
+    """LLM client with the GeminiClient call surface, talking to the stand-in server."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+
+    def generate(self, prompt: str) -> str:
+        with socket.create_connection((self.host, self.port)) as sock:
+            sock.sendall(prompt.replace("\n", " ").encode("utf-8") + b"\n")
+            return sock.makefile("r", encoding="utf-8").readline().strip()
+
+    async def agenerate(self, prompt: str) -> str:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(prompt.replace("\n", " ").encode("utf-8") + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+        writer.close()
+        return line.decode("utf-8").strip()
+
+
+def bench_concurrency(n_requests: int = 200, latency_ms: float = 200,
+                      levels: Sequence[int] = (8, 200)) -> Dict[str, Dict[str, float]]:
+    client = StandInClient(*start_stand_in_server(latency_ms))
+    prompts = [f"question {i}" for i in range(n_requests)]
+    results: Dict[str, Dict[str, float]] = {}
+    expected = None
+    for level in levels:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            sync_out = list(pool.map(client.generate, prompts))
+        sync_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        async_out = aio.run(aio.agenerate_many(client, prompts, limit=level))
+        async_s = time.perf_counter() - t0
+        assert sync_out == async_out == (expected or sync_out)
+        expected = sync_out
+        results[f"sync  {level:>4} in flight"] = {"seconds": sync_s, "req_per_s": n_requests / sync_s, "threads": level}
+        results[f"async {level:>4} in flight"] = {"seconds": async_s, "req_per_s": n_requests / async_s, "threads": 1}
+    return results
+
+
+if __name__ == "__main__":  # Manual invocation helper
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 200
+    levels = [int(a) for a in sys.argv[3:]] or [8, n]
+    for label, r in bench_concurrency(n, latency, levels).items():
+        print(f"  {label:<22} {r['seconds']:6.2f} s  {r['req_per_s']:7.1f} req/s  {r['threads']:>4} thread(s)")
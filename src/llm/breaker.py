@@ -0,0 +1,197 @@
+"""Circuit breaker and failover from the primary (Gemini) to the local backend.
+
+While the circuit is closed the primary keeps its own retry / backoff loop;
+a call that exhausts it counts as one failure and its error is raised, as
+without the breaker. After config.breaker_failures consecutive failed calls
+the breaker opens: calls go straight to the fallback (LocalLLM, built only
+now) for config.breaker_cooldown_s seconds. Then a single half-open probe,
+with one attempt, is sent to the primary; success closes the breaker,
+failure re-opens it for another cool-down. A fallback without a real model
+(the LocalLLM stub) is never used to answer: the error is raised instead, so
+callers take their heuristic paths. Breakers are process-wide per backend,
+like the provider quota they protect; state and trip counts feed the sidebar
+and the health report.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from src.utils.logging import logger
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+PROBE_RETRIES = 1  # attempts of the half-open probe (closed-circuit calls use the client's retry loop)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_s: float = 60.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_s = cooldown_s
+        self.state = CLOSED
+        self.failures = 0  # consecutive
+        self.trips = 0
+        self.last_error: Optional[str] = None
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May this call use the primary? While open only one half-open probe is let through after the cool-down."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.cooldown_s
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Circuit %s closed", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, err: Exception) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(err)[:200]
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                    logger.warning("Circuit %s open for %.0f s after %d failure(s): %s", self.name, self.cooldown_s, self.failures, self.last_error)
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self.cooldown_s - (time.monotonic() - self._opened_at)) if self.state == OPEN else 0.0
+            return {
+                "backend": self.name, "state": self.state, "consecutive_failures": self.failures,
+                "trips": self.trips, "retry_in_s": round(retry_in, 1), "last_error": self.last_error,
+            }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_LOCK = threading.Lock()
+
+
+def get_breaker(name: str, failure_threshold: int, cooldown_s: float) -> CircuitBreaker:
+    with _LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            breaker = _BREAKERS[name] = CircuitBreaker(name, failure_threshold, cooldown_s)
+        breaker.failure_threshold, breaker.cooldown_s = max(1, failure_threshold), cooldown_s
+        return breaker
+
+
+def breaker_status() -> List[Dict[str, Any]]:
+    with _LOCK:
+        breakers = list(_BREAKERS.values())
+    return [b.status() for b in breakers]
+
+
+class FailoverLLM:
+    """Primary client guarded by a breaker; calls it cannot take go to the (lazily built) fallback."""
+
+    def __init__(self, primary, fallback_factory: Callable[[], Any], breaker: CircuitBreaker):
+        self.primary = primary
+        self.breaker = breaker
+        self._fallback_factory = fallback_factory
+        self._fallback = None
+
+    @property
+    def fallback(self):
+        if self._fallback is None:
+            self._fallback = self._fallback_factory()
+        return self._fallback
+
+    def _active(self):
+        return self.fallback if self.breaker.is_open() else self.primary
+
+    def _failover(self, err: Optional[Exception] = None):
+        """The fallback for a call the primary did not answer, or raise `err` when there is none worth using."""
+        if err is not None and self._fallback is None and not self.breaker.is_open():
+            raise err  # isolated failure: not worth loading a local model for
+        fallback = self.fallback
+        if not getattr(fallback, "can_generate", True):  # stub text must not pass for an answer
+            raise err or RuntimeError(f"Circuit {self.breaker.name} is open and no local model is available")
+        return fallback
+
+    def _primary_kwargs(self) -> Dict[str, Any]:
+        """The half-open probe gets one attempt; a closed circuit leaves retries / backoff to the client."""
+        return {"max_retries": PROBE_RETRIES} if self.breaker.state == HALF_OPEN else {}
+
+    # Describe the client calls are currently routed to (cache keys, dispatch mode, capability query)
+    @property
+    def backend(self) -> str:
+        return getattr(self._active(), "backend", "")
+
+    @property
+    def can_generate(self) -> bool:
+        return bool(getattr(self._active(), "can_generate", True))
+
+    def __getattr__(self, name):  # tokenizer / context size etc. of the routed client
+        return getattr(self._active(), name)
+
+    def generate(self, prompt: str) -> str:
+        err = None
+        if self.breaker.allow():
+            try:
+                text = self.primary.generate(prompt, **self._primary_kwargs())
+                self.breaker.record_success()
+                return text
+            except Exception as e:
+                self.breaker.record_failure(e)
+                err = e
+        return self._failover(err).generate(prompt)
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        """Batched on the local fallback while the circuit is open; otherwise one generate() per prompt."""
+        if self.breaker.is_open():
+            batch = getattr(self._failover(), "generate_batch", None)
+            if batch:
+                return batch(list(prompts))
+        return [self.generate(p) for p in prompts]
+
+    async def agenerate(self, prompt: str) -> str:
+        from src.utils import aio
+        err = None
+        if self.breaker.allow():
+            try:
+                text = await self.primary.agenerate(prompt, **self._primary_kwargs())
+                self.breaker.record_success()
+                return text
+            except Exception as e:
+                self.breaker.record_failure(e)
+                err = e
+        fallback = await aio.to_thread(self._failover, err)  # may load the local model
+        return await aio.agenerate(fallback, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        err = None
+        if self.breaker.allow():
+            started = False
+            try:
+                for piece in self.primary.stream(prompt, **self._primary_kwargs()):
+                    started = True
+                    yield piece
+                self.breaker.record_success()
+                return
+            except GeneratorExit:  # consumer stopped reading; the primary was answering
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                self.breaker.record_failure(e)
+                if started:  # cannot replay text the caller already consumed
+                    raise
+                err = e
+        yield from self._failover(err).stream(prompt)
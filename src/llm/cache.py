@@ -0,0 +1,193 @@
+"""Persistent LLM response cache.
+
+`CachedLLM` wraps a generation client (GeminiClient / LocalLLM) and stores its
+answers in a local SQLite file keyed by (backend, model, temperature,
+max_tokens, SHA-256 of the prompt). The map prompts of a Full Analyze are
+deterministic for a given contract, so re-analyzing an unchanged document is
+served entirely from disk. Entries expire after a TTL; the file is capped in
+size with least-recently-used eviction. Set LLM_CACHE=false to disable it, or
+wrap calls in `bypass_llm_cache()` to force fresh answers (results are still
+stored). Stub and error outputs are never cached.
+"""
+from __future__ import annotations
+import contextlib
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+from src.utils.logging import logger
+
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+_STATS_LOCK = threading.Lock()
+_BYPASS: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+def _bump(counter: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[counter] += n
+
+
+@contextlib.contextmanager
+def bypass_llm_cache() -> Iterator[None]:
+    """Within this block, cached answers are ignored and replaced (follows map_generate / aio.to_thread workers)."""
+    token = _BYPASS.set(True)
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float = 0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, nbytes INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(backend: str, model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{backend}:{model}:{temperature:g}:{max_tokens}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT text, created FROM responses WHERE key=?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                    self._conn.commit()
+                    return None
+                self._conn.execute("UPDATE responses SET last_used=? WHERE key=?", (now, key))
+                self._conn.commit()
+                return row[0]
+            except sqlite3.Error as e:  # cache is best-effort; never block generation
+                logger.warning("LLM cache read failed: %s", e)
+                return None
+
+    def put(self, key: str, text: str) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, text, len(text.encode("utf-8")), now, now)
+                )
+                self._evict(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("LLM cache write failed: %s", e)
+
+    def _evict(self, now: float) -> None:
+        removed = 0
+        if self.ttl_seconds:
+            removed += self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            doomed = []
+            for key, nbytes in self._conn.execute("SELECT key, nbytes FROM responses ORDER BY last_used"):
+                doomed.append((key,))
+                excess -= nbytes
+                if excess <= 0:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key=?", doomed)
+            removed += len(doomed)
+        if removed:
+            _bump("evictions", removed)
+
+
+@lru_cache(maxsize=4)
+def response_cache(path: str, max_bytes: int, ttl_seconds: float) -> ResponseCache:
+    """One connection per cache file and settings, shared by every wrapped client."""
+    return ResponseCache(path, max_bytes, ttl_seconds)
+
+
+class CachedLLM:
+    """Generation client proxy that serves repeated prompts from a ResponseCache."""
+
+    def __init__(self, client, cache: ResponseCache):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name):  # backend, model_name, pipe, ... of the wrapped client
+        return getattr(self.client, name)
+
+    @property
+    def can_generate(self) -> bool:
+        return bool(getattr(self.client, "can_generate", True))
+
+    def _key(self, prompt: str) -> str:
+        c = self.client
+        return self.cache.key(c.backend, c.model_name, c.temperature, c.max_tokens, prompt)
+
+    def _lookup(self, prompt: str) -> Optional[str]:
+        if not self.can_generate:  # stub text is cheap and must not outlive a model becoming available
+            return None
+        if _BYPASS.get():
+            _bump("misses")
+            return None
+        text = self.cache.get(self._key(prompt))
+        _bump("hits" if text is not None else "misses")
+        return text
+
+    def _store(self, prompt: str, text: str) -> None:
+        if self.can_generate and text and not getattr(self.client, "is_error_text", lambda _t: False)(text):
+            self.cache.put(self._key(prompt), text)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        text = self._lookup(prompt)
+        if text is None:
+            text = self.client.generate(prompt, **kwargs)
+            self._store(prompt, text)
+        return text
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        """Cached prompts are answered from the store; the distinct misses go to the client as one batch."""
+        found = {p: self._lookup(p) for p in dict.fromkeys(prompts)}
+        misses = [p for p, text in found.items() if text is None]
+        if misses:
+            batch = getattr(self.client, "generate_batch", None)
+            texts = batch(misses) if batch else [self.client.generate(p) for p in misses]
+            for prompt, text in zip(misses, texts):
+                self._store(prompt, text)
+                found[prompt] = text
+        return [found[p] for p in prompts]
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        from src.utils import aio
+        text = self._lookup(prompt)
+        if text is None:
+            text = await aio.agenerate(self.client, prompt, **kwargs)
+            self._store(prompt, text)
+        return text
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        text = self._lookup(prompt)
+        if text is not None:
+            yield text
+            return
+        pieces = []
+        for piece in self.client.stream(prompt, **kwargs):
+            pieces.append(piece)
+            yield piece
+        self._store(prompt, "".join(pieces))
+
+
+def llm_cache_stats() -> Dict[str, int]:
+    """Process-wide hit / miss / eviction counters (for sidebar & logs)."""
+    with _STATS_LOCK:
+        return dict(_STATS)
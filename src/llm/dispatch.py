@@ -0,0 +1,88 @@
+"""Concurrent dispatch of independent map-stage prompts, within provider rate limits.
+
+The summarizer, clause and red-flag map loops hand their prompts to
+`map_generate`, which runs them on a shared thread pool (at most
+config.llm_concurrency in flight) and returns answers in prompt order. The
+local backend is compute bound, so its prompts run one at a time.
+
+Remote clients take from a process-wide `RateLimiter` (token buckets sized by
+config.llm_rpm requests / minute and config.llm_tpm prompt tokens / minute)
+before each API call, because the provider quota is per API key, not per
+session. The limiter sits behind the response cache, so cached answers never
+spend budget.
+"""
+from __future__ import annotations
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Sequence
+from src.utils.config import AppConfig
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to `capacity`; acquire() blocks until enough are available."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = 0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1) -> float:
+        """Take `n` units (clamped to capacity, so oversized requests still pass); returns seconds waited."""
+        n = min(n, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return waited
+                delay = (n - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets (0 disables either)."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+
+    def acquire(self, n_tokens: int) -> float:
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None:
+            waited += self.tokens.acquire(n_tokens)
+        return waited
+
+
+@lru_cache(maxsize=8)
+def get_limiter(backend: str, rpm: int, tpm: int) -> RateLimiter:
+    """One limiter per backend and budget, shared by every session in the process."""
+    return RateLimiter(rpm, tpm)
+
+
+@lru_cache(maxsize=4)
+def _executor(workers: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-map")
+
+
+def map_generate(config: AppConfig, llm, prompts: Sequence[str]) -> List[str]:
+    """llm.generate(p) for every prompt, concurrently up to config.llm_concurrency (local: batched); in prompt order."""
+    if getattr(llm, "backend", None) == "local":
+        # One model on this host: threads would only contend for it, batching shares each forward pass
+        batch = getattr(llm, "generate_batch", None)
+        return batch(list(prompts)) if batch else [llm.generate(p) for p in prompts]
+    if config.llm_concurrency <= 1 or len(prompts) <= 1:
+        return [llm.generate(p) for p in prompts]
+    # Shared pool: concurrent analyses together stay within llm_concurrency workers
+    ctx = contextvars.copy_context()  # e.g. bypass_llm_cache() set by the caller
+    return list(_executor(config.llm_concurrency).map(lambda p: ctx.copy().run(llm.generate, p), prompts))
@@ -1,21 +1,29 @@
 from __future__ import annotations
 from functools import lru_cache
 from src.utils.config import AppConfig
+from typing import Iterator, List, Optional
+import importlib.util
 import os
+import threading
 
 LIGHTWEIGHT_DEFAULT = "distilgpt2"  # small CPU friendly model
+GENERATION_ERROR = "Local generation error; please provide a Gemini API key for higher quality responses."
 
-try:  # defer heavy imports, handle missing deps
-    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline  # type: ignore
-    import torch  # type: ignore
-    _TRANS_AVAILABLE = True
-except Exception:  # pragma: no cover
-    _TRANS_AVAILABLE = False
+
+@lru_cache(maxsize=1)
+def _transformers_available() -> bool:
+    """Cheap presence check; transformers / torch are only imported once a model is actually loaded."""
+    return all(importlib.util.find_spec(m) is not None for m in ("transformers", "torch"))
 
 
 @lru_cache(maxsize=1)
 def _get_pipe(model_name: str, temperature: float):  # pragma: no cover - heavy
-    if not _TRANS_AVAILABLE:
+    if not _transformers_available():
+        return None
+    try:  # defer heavy imports, handle broken installs
+        from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline  # type: ignore
+        import torch  # type: ignore
+    except Exception:
         return None
     try:
         tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
@@ -37,18 +45,60 @@ def _get_pipe(model_name: str, temperature: float):  # pragma: no cover - heavy
 class LocalLLM:
     """Graceful local model wrapper; falls back to template stub if transformers unavailable."""
 
+    backend = "local"
+
     def __init__(self, config: AppConfig):
         self.temperature = config.temperature
         self.max_tokens = config.max_tokens
+        self.batch_size = max(1, config.local_batch_size)
         preferred = config.local_llm_model or LIGHTWEIGHT_DEFAULT
         if os.getenv("LOCAL_LLM_SMALL", "false").lower() == "true":
             preferred = LIGHTWEIGHT_DEFAULT
         self.pipe = None
-        if _TRANS_AVAILABLE:
+        if _transformers_available():
             try:
                 self.pipe = _get_pipe(preferred, self.temperature)
             except Exception:
                 self.pipe = None
+        # The pipeline may have fallen back to LIGHTWEIGHT_DEFAULT; name what actually generates
+        self.model_name = getattr(getattr(self.pipe, "model", None), "name_or_path", None) or preferred
+
+    @property
+    def can_generate(self) -> bool:
+        """False when only the template stub is available (transformers missing / model load failed)."""
+        return self.pipe is not None
+
+    @staticmethod
+    def is_error_text(text: str) -> bool:
+        return text == GENERATION_ERROR
+
+    @property
+    def max_new_tokens(self) -> int:
+        return min(self.max_tokens, 256)
+
+    @property
+    def context_tokens(self) -> Optional[int]:
+        """Model context length (prompt + generated tokens), None without a model."""
+        if not self.pipe:
+            return None
+        n = getattr(self.pipe.tokenizer, "model_max_length", None)
+        if not n or n > 1_000_000:  # transformers' "unset" sentinel is a huge int
+            n = getattr(getattr(self.pipe.model, "config", None), "max_position_embeddings", None)
+        return n
+
+    def count_tokens(self, text: str) -> int:
+        if not self.pipe:
+            from src.llm.packing import count_tokens
+            return count_tokens(text)
+        return len(self.pipe.tokenizer(text)["input_ids"])
+
+    def _generation_kwargs(self) -> dict:
+        return {
+            "max_new_tokens": self.max_new_tokens,
+            "do_sample": self.temperature > 0,
+            "temperature": self.temperature,
+            "pad_token_id": getattr(self.pipe.tokenizer, "eos_token_id", None),
+        }
 
     def generate(self, prompt: str) -> str:
         if not self.pipe:
@@ -56,15 +106,89 @@ class LocalLLM:
             tail = prompt.splitlines()[-8:]
             return "Fallback (no local model). Context signals: " + " ".join(t[:60] for t in tail)[:400]
         try:
-            out = self.pipe(
-                prompt,
-                max_new_tokens=min(self.max_tokens, 256),
-                do_sample=self.temperature > 0,
-                temperature=self.temperature,
-                num_return_sequences=1,
-                pad_token_id=getattr(self.pipe.tokenizer, "eos_token_id", None),
-            )
+            out = self.pipe(prompt, num_return_sequences=1, **self._generation_kwargs())
             text = out[0]["generated_text"]
             return text[len(prompt):].strip() if text.startswith(prompt) else text
         except Exception:  # pragma: no cover
-            return "Local generation error; please provide a Gemini API key for higher quality responses."
+            return GENERATION_ERROR
+
+    def _batch_tokenizer(self):
+        tokenizer = self.pipe.tokenizer
+        # Decoder-only models continue from the last position: pad on the left, or short prompts
+        # would generate after a run of pad tokens
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        return tokenizer
+
+    def generate_batch(self, prompts: List[str], batch_size: Optional[int] = None) -> List[str]:
+        """generate() for many prompts, several per model.generate() call; answers in prompt order.
+
+        Prompts are sorted by token length and cut into batches of `batch_size` (default
+        config.local_batch_size), so each batch pads to similar lengths. A batch that fails
+        (e.g. out of memory) is retried one prompt at a time.
+        """
+        size = max(1, batch_size or self.batch_size)
+        if not self.pipe or size == 1 or len(prompts) <= 1:
+            return [self.generate(p) for p in prompts]
+        try:
+            import torch  # type: ignore
+            tokenizer, model = self._batch_tokenizer(), self.pipe.model
+            encoded = [tokenizer(p)["input_ids"] for p in prompts]
+        except Exception:  # pragma: no cover
+            return [self.generate(p) for p in prompts]
+        kwargs = dict(self._generation_kwargs(), pad_token_id=tokenizer.pad_token_id)
+        order = sorted(range(len(prompts)), key=lambda i: -len(encoded[i]))
+        out: List[str] = [""] * len(prompts)
+        for start in range(0, len(order), size):
+            idx = order[start:start + size]
+            try:
+                batch = tokenizer.pad({"input_ids": [encoded[i] for i in idx]}, return_tensors="pt").to(model.device)
+                with torch.inference_mode():
+                    generated = model.generate(**batch, **kwargs)
+                # Left padding: every row's prompt ends at the same column
+                texts = tokenizer.batch_decode(generated[:, batch["input_ids"].shape[1]:], skip_special_tokens=True)
+                for i, text in zip(idx, texts):
+                    out[i] = text.strip()
+            except Exception:  # pragma: no cover
+                for i in idx:
+                    out[i] = self.generate(prompts[i])
+        return out
+
+    async def agenerate(self, prompt: str) -> str:
+        """generate() on the shared blocking pool (src.utils.aio); local inference is CPU / GPU bound."""
+        from src.utils import aio
+        return await aio.to_thread(self.generate, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield generated text piece by piece (transformers TextIteratorStreamer); the stub yields its text once."""
+        if not self.pipe:
+            yield self.generate(prompt)
+            return
+        try:
+            from transformers import TextIteratorStreamer  # type: ignore
+            tokenizer, model = self.pipe.tokenizer, self.pipe.model
+            streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+            inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        except Exception:  # pragma: no cover
+            yield self.generate(prompt)
+            return
+        errors: List[Exception] = []
+
+        def run():  # generation runs on a worker thread and feeds the streamer
+            try:
+                model.generate(**inputs, streamer=streamer, **self._generation_kwargs())
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=run, name="local-llm-stream", daemon=True)
+        worker.start()
+        produced = False
+        for text in streamer:
+            if text:
+                produced = True
+                yield text
+        worker.join()
+        if errors and not produced:
+            yield GENERATION_ERROR
@@ -1,26 +1,119 @@
 from __future__ import annotations
-import google.generativeai as genai
+import asyncio
 import os
+import random
+import re
 import time
-from typing import List
+from typing import Iterator, List, Optional
+from src.llm.dispatch import get_limiter
+from src.llm.packing import count_tokens
 from src.utils.config import AppConfig
 
+BACKOFF_BASE_S = 1.0
+BACKOFF_CAP_S = 30.0
+MAX_RETRY_HINT_S = 60.0  # never wait longer than this on a server hint
+_HINT_RES = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.I),
+    re.compile(r"retry (?:in|after) ([\d.]+)\s*s", re.I),
+]
+
+
+def retry_hint(err: Exception) -> Optional[float]:
+    """Server-suggested wait in seconds: google.rpc RetryInfo, a Retry-After header, or the hint in the message."""
+    try:
+        for detail in getattr(err, "details", None) or []:
+            delay = getattr(detail, "retry_delay", None)
+            if delay is not None:
+                return delay.seconds + delay.nanos / 1e9
+        headers = getattr(getattr(err, "response", None), "headers", None) or {}
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError, AttributeError):
+        pass
+    for pattern in _HINT_RES:
+        m = pattern.search(str(err))
+        if m:
+            return float(m.group(1))
+    return None
+
+
+def backoff_delay(attempt: int, err: Exception) -> float:
+    """Full-jitter exponential backoff, raised to the server's retry hint when it gives one."""
+    delay = random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt))
+    hint = retry_hint(err)
+    if hint is not None:
+        delay = max(delay, min(hint, MAX_RETRY_HINT_S))
+    return delay
+
+
 class GeminiClient:
+    backend = "gemini"
+    model_name = "gemini-1.5-flash"
+    context_tokens = 1_048_576
+
     def __init__(self, config: AppConfig):
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not set")
+        import google.generativeai as genai  # imported on first use (slow SDK import)
         genai.configure(api_key=api_key)
         self.config = config
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
+        self.temperature = config.temperature
+        self.max_tokens = config.max_tokens
+        self.max_new_tokens = config.max_tokens
+        self.limiter = get_limiter(self.backend, config.llm_rpm, config.llm_tpm)  # per-key quota, shared process-wide
+        self.model = genai.GenerativeModel(self.model_name)
+
+    can_generate = True  # capability query shared with LocalLLM (see src.llm.registry)
+
+    def _generation_config(self) -> dict:
+        return {"temperature": self.temperature, "max_output_tokens": self.max_tokens}
 
     def generate(self, prompt: str, max_retries: int = 3) -> str:
         last_err = None
         for attempt in range(max_retries):
+            self.limiter.acquire(count_tokens(prompt))
+            try:
+                rsp = self.model.generate_content(prompt, generation_config=self._generation_config())
+                return rsp.text
+            except Exception as e:  # pragma: no cover - external API
+                last_err = e
+                if attempt + 1 < max_retries:
+                    time.sleep(backoff_delay(attempt, e))
+        raise RuntimeError(f"Gemini generation failed: {last_err}")
+
+    async def agenerate(self, prompt: str, max_retries: int = 3) -> str:
+        """Non-blocking generate (SDK aio client); run on the shared loop in src.utils.aio."""
+        from src.utils import aio
+        last_err = None
+        for attempt in range(max_retries):
+            await aio.to_thread(self.limiter.acquire, count_tokens(prompt))
             try:
-                rsp = self.model.generate_content(prompt, generation_config={"temperature": self.config.temperature, "max_output_tokens": self.config.max_tokens})
+                rsp = await self.model.generate_content_async(prompt, generation_config=self._generation_config())
                 return rsp.text
             except Exception as e:  # pragma: no cover - external API
                 last_err = e
-                time.sleep(1 + attempt)
+                if attempt + 1 < max_retries:
+                    await asyncio.sleep(backoff_delay(attempt, e))
+        raise RuntimeError(f"Gemini generation failed: {last_err}")
+
+    def stream(self, prompt: str, max_retries: int = 3) -> Iterator[str]:
+        """Yield answer text as the API streams it; retries only until the first piece arrived."""
+        last_err = None
+        for attempt in range(max_retries):
+            started = False
+            self.limiter.acquire(count_tokens(prompt))
+            try:
+                for chunk in self.model.generate_content(prompt, generation_config=self._generation_config(), stream=True):
+                    text = chunk.text
+                    if text:
+                        started = True
+                        yield text
+                return
+            except Exception as e:  # pragma: no cover - external API
+                if started:  # cannot replay text the caller already consumed
+                    raise RuntimeError(f"Gemini stream interrupted: {e}") from e
+                last_err = e
+                if attempt + 1 < max_retries:
+                    time.sleep(backoff_delay(attempt, e))
         raise RuntimeError(f"Gemini generation failed: {last_err}")
@@ -0,0 +1,127 @@
+"""Token-budget prompt packing for the map / reduce stages.
+
+Instead of a fixed number of chunks / clauses per prompt, `pack_prompts` fills
+each prompt greedily, in order, up to the input budget:
+
+    min(config.prompt_budget_tokens, model context - output allowance) - template overhead
+
+Tokens are counted with the client's own tokenizer when it has one (LocalLLM),
+otherwise with tiktoken (cl100k_base, an approximation for Gemini) or a
+4-characters-per-token estimate if tiktoken is unavailable. An item that alone
+exceeds the budget is truncated rather than overflowing the context.
+`packing_stats` reports prompts and tokens per call for each stage.
+"""
+from __future__ import annotations
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+from src.utils.config import AppConfig
+from src.utils.logging import logger
+
+TokenCounter = Callable[[str], int]
+TIKTOKEN_ENCODING = "cl100k_base"
+DEFAULT_OUTPUT_TOKENS = 1024
+
+_STATS: Dict[str, Dict[str, int]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@lru_cache(maxsize=2)
+def _tiktoken_counter(encoding: str) -> Optional[TokenCounter]:
+    try:
+        import tiktoken  # type: ignore
+        enc = tiktoken.get_encoding(encoding)
+    except Exception as e:  # missing package or encoding download failure
+        logger.info("tiktoken unavailable (%s); estimating tokens from length", e)
+        return None
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    """Provider-neutral token count (tiktoken when installed)."""
+    counter = _tiktoken_counter(TIKTOKEN_ENCODING)
+    return counter(text) if counter else approx_tokens(text)
+
+
+def token_counter(llm=None) -> TokenCounter:
+    """The client's own tokenizer when it exposes one, else count_tokens."""
+    own = getattr(llm, "count_tokens", None)
+    return own if callable(own) else count_tokens
+
+
+def input_budget(config: AppConfig, llm=None) -> int:
+    """Prompt tokens per call: the configured budget, bounded by the model context minus its output allowance."""
+    budget = config.prompt_budget_tokens
+    context = getattr(llm, "context_tokens", None)
+    if context:
+        output = getattr(llm, "max_new_tokens", None) or DEFAULT_OUTPUT_TOKENS
+        budget = min(budget, context - output)
+    return max(64, budget)
+
+
+def truncate_to(text: str, limit: int, count: TokenCounter) -> str:
+    """Longest prefix of `text` within `limit` tokens (approximately, by shrinking on characters)."""
+    n = count(text)
+    while n > limit and text:
+        text = text[:max(0, int(len(text) * limit / n * 0.95))]
+        n = count(text)
+    return text
+
+
+def pack(texts: Sequence[str], limit: int, count: TokenCounter, sep: str = "\n\n") -> List[List[str]]:
+    """Split `texts` (in order) into groups whose joined size stays within `limit` tokens."""
+    sep_tokens = count(sep) if sep else 0
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for text in texts:
+        n = count(text)
+        if n > limit:
+            text = truncate_to(text, limit, count)
+            n = count(text)
+        extra = n + (sep_tokens if current else 0)
+        if current and used + extra > limit:
+            groups.append(current)
+            current, used, extra = [], 0, n
+        current.append(text)
+        used += extra
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _record(stage: str, tokens: List[int]) -> None:
+    with _STATS_LOCK:
+        s = _STATS.setdefault(stage, {"calls": 0, "tokens": 0, "max_tokens": 0})
+        s["calls"] += len(tokens)
+        s["tokens"] += sum(tokens)
+        s["max_tokens"] = max([s["max_tokens"]] + tokens)
+
+
+def pack_prompts(config: AppConfig, llm, stage: str, template: Callable[[str], str], texts: Sequence[str],
+                 sep: str = "\n\n") -> List[str]:
+    """Prompts `template(joined texts)` that each fit the input budget of `llm`; every text is used once, in order."""
+    if not texts:
+        return []
+    count = token_counter(llm)
+    budget = input_budget(config, llm)
+    limit = max(16, budget - count(template("")))
+    prompts = [template(sep.join(group)) for group in pack(texts, limit, count, sep)]
+    sizes = [count(p) for p in prompts]
+    _record(stage, sizes)
+    logger.info("%s: %d item(s) packed into %d prompt(s), %.0f tokens/call (budget %d)",
+                stage, len(texts), len(prompts), sum(sizes) / len(sizes), budget)
+    return prompts
+
+
+def packing_stats() -> Dict[str, Dict[str, float]]:
+    """Per stage: prompts sent, mean and max prompt tokens per call (for sidebar & logs)."""
+    with _STATS_LOCK:
+        return {
+            stage: {"calls": s["calls"], "avg_tokens": s["tokens"] / s["calls"], "max_tokens": s["max_tokens"]}
+            for stage, s in _STATS.items() if s["calls"]
+        }
@@ -0,0 +1,145 @@
+"""Process-wide LLM provider registry.
+
+Each backend ("gemini", "local") is constructed once per generation settings
+(wrapped in the persistent response cache, src.llm.cache, unless disabled) and shared by the summarizer, clause / red-flag analysis, the QA chain and the
+warm-up thread, instead of re-running `genai.configure` or re-probing the local
+model on every call. The registry remembers whether a backend could be built
+(and why not), which the health report exposes. Gemini is handed out behind a circuit
+breaker with LocalLLM failover (src.llm.breaker).
+
+`can_generate` is the capability query that replaces ad-hoc stub detection:
+callers switch to their heuristic paths when the active client cannot
+produce real text (LocalLLM without a transformers pipeline).
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils.config import AppConfig
+from src.utils.logging import logger
+
+BACKENDS = ("gemini", "local")
+
+
+@dataclass
+class Provider:
+    backend: str
+    client: Any = None
+    error: Optional[str] = None
+    build_ms: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.client is not None
+
+    @property
+    def can_generate(self) -> bool:
+        return self.ready and can_generate(self.client)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend, "ready": self.ready, "can_generate": self.can_generate,
+            "error": self.error, "build_ms": round(self.build_ms, 1),
+        }
+
+
+_LOCK = threading.Lock()
+_PROVIDERS: Dict[Tuple, Provider] = {}
+_BUILD_LOCKS: Dict[Tuple, threading.Lock] = {}
+
+
+def can_generate(llm) -> bool:
+    """True unless the client reports it only has the template stub (clients without the query generate)."""
+    return bool(getattr(llm, "can_generate", True))
+
+
+def _cache_key(config: AppConfig) -> Tuple:
+    if not config.llm_cache or config.llm_cache_mb <= 0:
+        return ()
+    return (config.workspace_dir, config.llm_cache_mb, config.llm_cache_ttl_hours)
+
+
+def _key(backend: str, config: AppConfig) -> Tuple:
+    if backend == "gemini":
+        return (backend, config.temperature, config.max_tokens) + _cache_key(config)
+    small = config.use_small_local or os.getenv("LOCAL_LLM_SMALL", "false").lower() == "true"
+    return (backend, config.temperature, config.max_tokens, config.local_llm_model, small) + _cache_key(config)
+
+
+def _build(backend: str, config: AppConfig):
+    if backend == "gemini":
+        from src.llm.gemini import GeminiClient
+        client = GeminiClient(config)
+    else:
+        from src.llm.fallback import LocalLLM
+        client = LocalLLM(config)
+    if _cache_key(config):
+        from src.llm.cache import CachedLLM, response_cache
+        path = os.path.join(config.workspace_dir, "llm_cache.sqlite")
+        client = CachedLLM(client, response_cache(path, config.llm_cache_mb * 1024 * 1024, config.llm_cache_ttl_hours * 3600))
+    return client
+
+
+def get_provider(backend: str, config: AppConfig) -> Provider:
+    """The shared provider for `backend` (built on first request; failures are remembered, not retried)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    key = _key(backend, config)
+    with _LOCK:
+        provider = _PROVIDERS.get(key)
+        if provider is not None:
+            return provider
+        build_lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+    with build_lock:  # one build per key; other threads wait for it instead of building their own
+        with _LOCK:
+            provider = _PROVIDERS.get(key)
+        if provider is not None:
+            return provider
+        provider = Provider(backend)
+        t0 = time.perf_counter()
+        try:
+            provider.client = _build(backend, config)
+        except Exception as e:
+            provider.error = str(e)
+            logger.warning("LLM backend %s unavailable: %s", backend, e)
+        provider.build_ms = (time.perf_counter() - t0) * 1000
+        with _LOCK:
+            _PROVIDERS[key] = provider
+        return provider
+
+
+_FAILOVERS: Dict[Tuple, Any] = {}
+
+
+def get_llm(config: AppConfig):
+    """Shared client for the configured backend.
+
+    With Gemini enabled and available this is Gemini behind a circuit breaker that
+    fails over to LocalLLM (built only when first needed); otherwise LocalLLM.
+    """
+    if config.use_gemini:
+        provider = get_provider("gemini", config)
+        if provider.ready:
+            key = _key("gemini", config) + _key("local", config) + (config.breaker_failures, config.breaker_cooldown_s)
+            with _LOCK:
+                client = _FAILOVERS.get(key)
+                if client is None:
+                    from src.llm.breaker import FailoverLLM, get_breaker
+                    breaker = get_breaker("gemini", config.breaker_failures, config.breaker_cooldown_s)
+                    client = _FAILOVERS[key] = FailoverLLM(provider.client, lambda: get_provider("local", config).client, breaker)
+            return client
+    return get_provider("local", config).client
+
+
+def provider_status() -> List[Dict[str, Any]]:
+    """State of every provider built so far, with its circuit breaker if any (nothing is constructed here)."""
+    from src.llm.breaker import breaker_status
+    breakers = {b["backend"]: b for b in breaker_status()}
+    with _LOCK:
+        providers = [p.status() for p in _PROVIDERS.values()]
+    for p in providers:
+        if p["backend"] in breakers:
+            p["breaker"] = breakers[p["backend"]]
+    return providers
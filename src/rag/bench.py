@@ -0,0 +1,71 @@
+"""Retrieval comparison on the fixture question set (manual use, not part of the app).
+
+    python -m src.rag.bench [n_distractor_chunks]
+
+Indexes the 40 fixture clauses (one chunk each) plus synthetic contract-like
+distractor chunks through FaissStoreManager, then reports hit@5 (a relevant
+clause among the top 5) and mean latency per question for dense-only, BM25-only
+and hybrid (reciprocal rank fusion) retrieval. The embedding model is whatever
+AppConfig.from_env() selects (the hashing fallback when no model is available).
+"""
+from __future__ import annotations
+import tempfile
+import time
+from dataclasses import replace
+from typing import Callable, Dict, List
+from src.embeddings.bench import FIXTURE_CLAUSES, FIXTURE_QUESTIONS, synthetic_corpus
+from src.embeddings.embeddings import embedding_tag, get_embedding_model
+from src.rag.retriever import FilteredRetriever
+from src.utils.config import AppConfig
+from src.utils.types import Chunk, Document
+
+# FIXTURE_QUESTIONS[i] -> indexes of FIXTURE_CLAUSES that answer it
+FIXTURE_RELEVANT = [
+    [0, 1], [3], [4, 24], [2], [9], [11], [13, 14], [15], [16, 17], [18, 19], [22], [6], [31], [30], [29],
+]
+K = 5
+
+
+def _fixture(n_distractors: int):
+    clauses = [Chunk(id=f"clause-{i}", document_name="fixture.pdf", page=i // 4 + 1, content=t) for i, t in enumerate(FIXTURE_CLAUSES)]
+    noise = [Chunk(id=f"noise-{i}", document_name="noise.pdf", page=i // 4 + 1, content=t) for i, t in enumerate(synthetic_corpus(n_distractors, chunk_chars=300))]
+    docs = [
+        Document(name="fixture.pdf", text=" ".join(FIXTURE_CLAUSES), pages=10, sha256="fixture-clauses"),
+        Document(name="noise.pdf", text=" ".join(c.content for c in noise), pages=n_distractors // 4 + 1, sha256=f"noise-{n_distractors}"),
+    ]
+    return docs, clauses + noise
+
+
+def _evaluate(search: Callable[[str], List[str]]) -> Dict[str, float]:
+    hits, elapsed = 0, 0.0
+    for question, relevant in zip(FIXTURE_QUESTIONS, FIXTURE_RELEVANT):
+        t0 = time.perf_counter()
+        ids = search(question)[:K]
+        elapsed += time.perf_counter() - t0
+        hits += any(f"clause-{i}" in ids for i in relevant)
+    return {"hit@5": hits / len(FIXTURE_QUESTIONS), "ms_per_query": elapsed * 1000 / len(FIXTURE_QUESTIONS)}
+
+
+def bench_retrieval(n_distractors: int = 2000) -> Dict[str, Dict[str, float]]:
+    from src.vectorstore.faiss_store import FaissStoreManager
+    config = replace(AppConfig.from_env(), workspace_dir=tempfile.mkdtemp(prefix="rag-bench-"), mmap_min_vectors=0)
+    embed = get_embedding_model(config)
+    docs, chunks = _fixture(n_distractors)
+    manager = FaissStoreManager(config)
+    vs = manager.build_index(docs, chunks, embed)
+    bm25 = manager.bm25_index(docs, chunks, embed)
+    dense = FilteredRetriever(vs, k=K)
+    hybrid = FilteredRetriever(vs, k=K, bm25=bm25)
+    print(f"embedding: {embedding_tag(embed)}, {len(chunks)} chunks, {len(FIXTURE_QUESTIONS)} questions")
+    return {
+        "dense": _evaluate(lambda q: [d.metadata["chunk_id"] for d in dense.invoke(q)]),
+        "bm25": _evaluate(lambda q: [cid for cid, _ in bm25.search(q, K)]),
+        "hybrid_rrf": _evaluate(lambda q: [d.metadata["chunk_id"] for d in hybrid.invoke(q)]),
+    }
+
+
+if __name__ == "__main__":  # Manual invocation helper
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for label, r in bench_retrieval(n).items():
+        print(f"  {label:<11} hit@5 {r['hit@5']:.2f}  {r['ms_per_query']:7.2f} ms/query")
@@ -0,0 +1,124 @@
+"""Inverted-index BM25 over chunks, the sparse half of hybrid retrieval.
+
+Term statistics are computed once per document at indexing time (`DocTerms`,
+persisted as bm25.json in the document's FAISS shard directory) using the QA
+stopword / stemming rules from src.rag.text. A per-session `BM25Index`
+combines the documents and keeps corpus-level document frequencies up to date
+as documents are added or removed, so a query only touches the postings of its
+own terms.
+"""
+from __future__ import annotations
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.rag.text import SYNONYMS, stem, terms, words
+from src.utils.types import Chunk
+
+VERSION = 1
+K1 = 1.5
+B = 0.75
+SYNONYM_WEIGHT = 0.5
+
+
+class DocTerms:
+    """Per-document postings: term -> [[chunk index, term frequency], ...]."""
+
+    def __init__(self, chunk_ids: List[str], pages: List[int], lengths: List[int], postings: Dict[str, List[List[int]]]):
+        self.chunk_ids = chunk_ids
+        self.pages = pages
+        self.lengths = lengths
+        self.postings = postings
+
+    @classmethod
+    def build(cls, chunks: Sequence[Chunk]) -> "DocTerms":
+        postings: Dict[str, List[List[int]]] = {}
+        lengths = []
+        for ci, chunk in enumerate(chunks):
+            tf = Counter(terms(chunk.content))
+            lengths.append(sum(tf.values()))
+            for term, n in tf.items():
+                postings.setdefault(term, []).append([ci, n])
+        return cls([c.id for c in chunks], [c.page or 0 for c in chunks], lengths, postings)
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "chunk_ids": self.chunk_ids, "pages": self.pages, "lengths": self.lengths, "postings": self.postings}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DocTerms"]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != VERSION:
+            return None
+        return cls(data["chunk_ids"], data["pages"], data["lengths"], data["postings"])
+
+
+def query_weights(question: str) -> Dict[str, float]:
+    """Query terms (weight 1) plus synonym expansions (SYNONYM_WEIGHT)."""
+    weights: Dict[str, float] = {}
+    for raw in words(question):
+        t = stem(raw)
+        weights[t] = 1.0
+        for phrase in SYNONYMS.get(raw, SYNONYMS.get(t, [])):
+            for syn in terms(phrase):
+                weights.setdefault(syn, SYNONYM_WEIGHT)
+    return weights
+
+
+class BM25Index:
+    """Per-session BM25 over the documents' DocTerms (document name -> part, upload order)."""
+
+    def __init__(self):
+        self.docs: Dict[str, DocTerms] = {}
+        self.df: Counter = Counter()
+        self.n_chunks = 0
+        self.total_len = 0
+
+    def _account(self, part: DocTerms, sign: int) -> None:
+        for term, plist in part.postings.items():
+            self.df[term] += sign * len(plist)
+            if self.df[term] <= 0:
+                del self.df[term]
+        self.n_chunks += sign * len(part.chunk_ids)
+        self.total_len += sign * sum(part.lengths)
+
+    def sync(self, names: Sequence[str], load) -> "BM25Index":
+        """Drop documents not in `names` and add missing ones via `load(name) -> DocTerms`."""
+        for name in [n for n in self.docs if n not in names]:
+            self._account(self.docs.pop(name), -1)
+        for name in names:
+            if name not in self.docs:
+                part = load(name)
+                self.docs[name] = part
+                self._account(part, +1)
+        return self
+
+    def search(self, question: str, k: int = 20, documents: Optional[Sequence[str]] = None,
+               pages: Optional[Tuple[int, int]] = None) -> List[Tuple[str, float]]:
+        """Top-k (chunk id, BM25 score), optionally restricted to documents / an inclusive page range."""
+        if not self.n_chunks:
+            return []
+        avgdl = self.total_len / self.n_chunks or 1.0
+        weights = query_weights(question)
+        idf = {t: math.log(1 + (self.n_chunks - self.df[t] + 0.5) / (self.df[t] + 0.5)) for t in weights if self.df.get(t)}
+        scores: Dict[str, float] = {}
+        for name, part in self.docs.items():
+            if documents and name not in documents:
+                continue
+            for term, w in idf.items():
+                w *= weights[term]
+                for ci, tf in part.postings.get(term, ()):
+                    if pages and not (pages[0] <= part.pages[ci] <= pages[1]):
+                        continue
+                    norm = tf + K1 * (1 - B + B * part.lengths[ci] / avgdl)
+                    cid = part.chunk_ids[ci]
+                    scores[cid] = scores.get(cid, 0.0) + w * tf * (K1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
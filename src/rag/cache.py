@@ -0,0 +1,105 @@
+"""Process-wide LRU caches for repeated questions.
+
+* Query embeddings, keyed by (embedding model tag, normalized question). Variants
+  that differ only in case, whitespace or trailing punctuation share one vector.
+* Full QA results, keyed by (index version, normalized question, filters). The
+  index version is a digest of the embedding tag and the indexed chunk ids, which
+  are content addressed. Any document change yields a new version, so stale
+  answers are never served. Identical document sets in different sessions share
+  entries.
+
+Both caches are bounded by `AppConfig.query_cache_size` entries (0 = off).
+`query_cache_stats` feeds the sidebar instrumentation.
+"""
+from __future__ import annotations
+import copy
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    return _WS_RE.sub(" ", question).strip().rstrip("?!. ").lower()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "hit_rate": self.hits / total if total else 0.0}
+
+
+_QUERY_VECTORS = LRUCache(1024)
+_RESULTS = LRUCache(1024)
+
+
+def configure(maxsize: int) -> None:
+    _QUERY_VECTORS.maxsize = _RESULTS.maxsize = maxsize
+
+
+def cached_query_vectors(model_tag: str, questions: Sequence[str], embed_many: Callable[[List[str]], Any]) -> List[Any]:
+    """Query vectors for `questions`, from the LRU where possible; all misses go to `embed_many` in one call."""
+    keys = [(model_tag, normalize_question(q)) for q in questions]
+    vectors = [_QUERY_VECTORS.get(key) for key in keys]
+    missing: Dict[Hashable, str] = {}
+    for key, q, vec in zip(keys, questions, vectors):
+        if vec is None and key not in missing:
+            missing[key] = q
+    if missing:
+        fresh = dict(zip(missing, embed_many(list(missing.values()))))
+        for key, vec in fresh.items():
+            _QUERY_VECTORS.put(key, vec)
+        vectors = [fresh[key] if vec is None else vec for key, vec in zip(keys, vectors)]
+    return vectors
+
+
+def index_version(vs) -> str:
+    """Digest of the embedding model and the (content-addressed) chunk ids in vs."""
+    from src.embeddings.embeddings import embedding_tag
+    h = hashlib.sha1(embedding_tag(vs.embedding_function).encode("utf-8"))
+    for doc_id in sorted(vs.index_to_docstore_id.values()):
+        h.update(doc_id.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def get_result(key: Hashable) -> Optional[Dict[str, Any]]:
+    hit = _RESULTS.get(key)
+    return copy.deepcopy(hit) if hit is not None else None
+
+
+def put_result(key: Hashable, result: Dict[str, Any]) -> None:
+    _RESULTS.put(key, copy.deepcopy(result))
+
+
+def query_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {"embeddings": _QUERY_VECTORS.stats(), "results": _RESULTS.stats()}
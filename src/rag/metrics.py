@@ -0,0 +1,39 @@
+"""Q&A latency instrumentation for streamed answers.
+
+Time to first token (TTFT) is what a user waits before text appears, so it is
+the primary Q&A latency metric; full answer time is kept alongside. A window of
+recent answers feeds the sidebar (median / p95).
+"""
+from __future__ import annotations
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+from src.utils.logging import logger
+
+_WINDOW: Deque[Tuple[float, float]] = deque(maxlen=200)  # (ttft ms, total ms)
+_LOCK = threading.Lock()
+
+
+def record_answer(ttft_ms: float, total_ms: float) -> None:
+    with _LOCK:
+        _WINDOW.append((ttft_ms, total_ms))
+    logger.info("Q&A answer: first token %.0f ms, complete %.0f ms", ttft_ms, total_ms)
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def qa_latency_stats() -> Dict[str, Any]:
+    with _LOCK:
+        window = list(_WINDOW)
+    if not window:
+        return {"count": 0, "ttft_p50_ms": None, "ttft_p95_ms": None, "total_p50_ms": None}
+    ttft = [t for t, _ in window]
+    return {
+        "count": len(window),
+        "ttft_p50_ms": _percentile(ttft, 0.5),
+        "ttft_p95_ms": _percentile(ttft, 0.95),
+        "total_p50_ms": _percentile([t for _, t in window], 0.5),
+    }
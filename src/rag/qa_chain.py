@@ -1,40 +1,246 @@
 from __future__ import annotations
-from typing import Dict, Any
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TYPE_CHECKING
+from src.utils import aio
 from src.utils.config import AppConfig
-from src.llm.gemini import GeminiClient
-from src.llm.fallback import LocalLLM
-from src.rag.retriever import get_retriever
+from src.llm.registry import can_generate, get_llm
+from src.rag.retriever import PageRange, get_retriever, matches_filter
+from src.rag import cache, metrics
+from src.rag.bm25 import BM25Index
+from src.rag.sentences import SentenceIndex
+from src.rag.text import SYNONYMS, stem, words
 
-from langchain_community.vectorstores import FAISS
+if TYPE_CHECKING:  # annotation only; avoid importing langchain_community at app start
+    from langchain_community.vectorstores import FAISS
+    from langchain.docstore.document import Document as LCDocument
 
 RAG_PROMPT_PATH = "src/prompts/rag_qa.txt"
 
 with open(RAG_PROMPT_PATH, "r", encoding="utf-8") as f:
     RAG_TEMPLATE = f.read()
 
+class _Plan(NamedTuple):
+    """How a question gets answered: citations, an optional LLM prompt, and the result builder."""
+    citations: List[Dict[str, Any]]
+    prompt: Optional[str]  # None: the answer is final without generation
+    finish: Callable[[Optional[str]], Dict[str, Any]]  # generated text (None = none / failed) -> result
+    tolerant: bool = True  # on generation errors use finish(None) instead of raising
+
+
 class QAChain:
-    def __init__(self, config: AppConfig, vs: FAISS, llm=None):
+    def __init__(self, config: AppConfig, vs: FAISS, llm=None, sentences: Optional[SentenceIndex] = None, bm25: Optional[BM25Index] = None):
         """QAChain orchestrates retrieval + answer synthesis.
 
         The optional `llm` parameter allows tests / smoke scripts to inject a stub
         and skip heavyweight LocalLLM / Gemini initialization (avoids model downloads
         or large imports in constrained CI environments).
+        `sentences` (built at indexing time) serves the definition fast path; without
+        it every chunk is re-split per definition question. `bm25` enables hybrid
+        (BM25 + dense, reciprocal rank fusion) retrieval when config.hybrid_retrieval.
+        Answers are memoized per index version (see src.rag.cache).
         """
         self.config = config
         self.vs = vs
-        self.retriever = get_retriever(vs)
-        if llm is not None:
-            self.llm = llm
-        else:
-            if getattr(config, 'use_gemini', False):
+        self.sentences = sentences
+        self._index_version: Optional[str] = None
+        cache.configure(getattr(config, 'query_cache_size', 1024))
+        self.retriever = get_retriever(
+            vs, nprobe=config.ann_nprobe, ef_search=config.ann_ef_search,
+            bm25=bm25 if getattr(config, 'hybrid_retrieval', True) else None,
+        )
+        self.llm = llm if llm is not None else get_llm(config)
+
+    def _definition_sentences(self, phrases, documents=None, pages=None):
+        """(page, sentence) pairs the definition fast path checks for the phrases."""
+        import re
+        if self.sentences is not None:
+            yield from self.sentences.definition_sentences(phrases, self.vs.docstore, documents, pages)
+            return
+        from src.vectorstore.docstore import iter_documents
+        for _, d in iter_documents(self.vs):  # streamed; the docstore may live on disk
+            if not matches_filter(d.metadata, documents, pages):
+                continue
+            for sent in re.split(r"(?<=[.!?])\s+", d.page_content):
+                s_clean = sent.strip()
+                if 10 < len(s_clean) < 420:
+                    yield d.metadata.get('page'), s_clean
+
+    def _result_key(self, question: str, documents: Optional[Sequence[str]], pages: Optional[PageRange]) -> tuple:
+        if self._index_version is None:  # the chain is rebuilt whenever the index changes
+            self._index_version = cache.index_version(self.vs)
+        return (
+            self._index_version, cache.normalize_question(question), tuple(sorted(documents or ())),
+            tuple(pages) if pages else None, self.retriever.bm25 is not None, getattr(self.llm, 'backend', type(self.llm).__name__),
+        )
+
+    def ask(self, question: str, documents: Optional[Sequence[str]] = None, pages: Optional[PageRange] = None) -> Dict[str, Any]:
+        """Answer `question`, optionally only from the named documents and an inclusive page range.
+
+        Repeated questions (after normalization) against the same index contents,
+        filters and answer backend are served from the result cache.
+        """
+        key = self._result_key(question, documents, pages)
+        hit = cache.get_result(key)
+        if hit is not None:
+            return hit
+        result = self._ask(question, documents, pages)
+        cache.put_result(key, result)
+        return result
+
+    def ask_many(self, questions: Sequence[str], documents: Optional[Sequence[str]] = None,
+                 pages: Optional[PageRange] = None, on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Answer a question list (e.g. a due-diligence checklist); results come back in input order.
+
+        Cached and duplicate questions are answered once. The rest are retrieved together
+        (one query-embedding batch, one multi-query FAISS search, shared chunks read once),
+        then synthesized on up to config.qa_batch_concurrency threads, which also bounds
+        the number of concurrent LLM calls. `on_result(i, result)` is called as each
+        answer completes (progress reporting; completion order, not input order).
+        """
+        keys = [self._result_key(q, documents, pages) for q in questions]
+        results: List[Optional[Dict[str, Any]]] = [cache.get_result(key) for key in keys]
+        pending: Dict[tuple, List[int]] = {}
+        for i, (key, res) in enumerate(zip(keys, results)):
+            if res is None:
+                pending.setdefault(key, []).append(i)
+            elif on_result:
+                on_result(i, res)
+        if pending:
+            firsts = [idxs[0] for idxs in pending.values()]
+            retrieved = self.retriever.invoke_many([questions[i] for i in firsts], documents, pages)
+
+            def answer(i: int, docs) -> Dict[str, Any]:
+                try:
+                    result = self._ask(questions[i], documents, pages, retrieved=docs)
+                    cache.put_result(keys[i], result)
+                except Exception as e:  # one failing question must not sink the checklist
+                    result = {"answer": f"QA failure: {e}", "citations": []}
+                return result
+
+            workers = max(1, min(getattr(self.config, 'qa_batch_concurrency', 4), len(firsts)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa-batch") as pool:
+                futures = {pool.submit(answer, i, docs): i for i, docs in zip(firsts, retrieved)}
+                for fut in as_completed(futures):
+                    result = fut.result()
+                    for j in pending[keys[futures[fut]]]:
+                        results[j] = copy.deepcopy(result)
+                        if on_result:
+                            on_result(j, results[j])
+        return results  # type: ignore[return-value]
+
+    async def aask(self, question: str, documents: Optional[Sequence[str]] = None,
+                   pages: Optional[PageRange] = None) -> Dict[str, Any]:
+        """Async `ask`: retrieval runs on the shared blocking pool, generation awaits the LLM client."""
+        key = self._result_key(question, documents, pages)
+        hit = cache.get_result(key)
+        if hit is not None:
+            return hit
+        result = await self._aask(question, documents, pages)
+        cache.put_result(key, result)
+        return result
+
+    async def aask_many(self, questions: Sequence[str], documents: Optional[Sequence[str]] = None,
+                        pages: Optional[PageRange] = None) -> List[Dict[str, Any]]:
+        """Async `ask_many` (batched retrieval, up to config.qa_batch_concurrency answers in flight)."""
+        keys = [self._result_key(q, documents, pages) for q in questions]
+        results: List[Optional[Dict[str, Any]]] = [cache.get_result(key) for key in keys]
+        pending: Dict[tuple, List[int]] = {}
+        for i, (key, res) in enumerate(zip(keys, results)):
+            if res is None:
+                pending.setdefault(key, []).append(i)
+        if pending:
+            firsts = [idxs[0] for idxs in pending.values()]
+            retrieved = await aio.to_thread(self.retriever.invoke_many, [questions[i] for i in firsts], documents, pages)
+
+            async def answer(item) -> Dict[str, Any]:
+                i, docs = item
+                try:
+                    result = await self._aask(questions[i], documents, pages, retrieved=docs)
+                    cache.put_result(keys[i], result)
+                except Exception as e:  # one failing question must not sink the batch
+                    result = {"answer": f"QA failure: {e}", "citations": []}
+                return result
+
+            answers = await aio.gather_limited(list(zip(firsts, retrieved)), answer, getattr(self.config, 'qa_batch_concurrency', 4))
+            for i, result in zip(firsts, answers):
+                for j in pending[keys[i]]:
+                    results[j] = copy.deepcopy(result)
+        return results  # type: ignore[return-value]
+
+    async def _aask(self, question: str, documents: Optional[Sequence[str]] = None, pages: Optional[PageRange] = None,
+                    retrieved: Optional[List[LCDocument]] = None) -> Dict[str, Any]:
+        plan = await aio.to_thread(self._plan, question, documents, pages, retrieved)
+        if plan.prompt is None:
+            return plan.finish(None)
+        try:
+            text = await aio.agenerate(self.llm, plan.prompt)
+        except Exception:
+            if not plan.tolerant:
+                raise
+            text = None
+        return plan.finish(text)
+
+    def _ask(self, question: str, documents: Optional[Sequence[str]] = None, pages: Optional[PageRange] = None,
+             retrieved: Optional[List[LCDocument]] = None) -> Dict[str, Any]:
+        """Answer synthesis; `retrieved` holds chunks already fetched for the question (ask_many)."""
+        plan = self._plan(question, documents, pages, retrieved)
+        if plan.prompt is None:
+            return plan.finish(None)
+        try:
+            text = self.llm.generate(plan.prompt)
+        except Exception:
+            if not plan.tolerant:
+                raise
+            text = None
+        return plan.finish(text)
+
+    def ask_stream(self, question: str, documents: Optional[Sequence[str]] = None,
+                   pages: Optional[PageRange] = None) -> Iterator[Tuple[str, Any]]:
+        """Streaming `ask`: yields ("citations", list), then ("token", str) pieces, then ("done", result).
+
+        Citations are known before generation starts, so they are emitted first.
+        The final result may differ from the concatenated tokens (an unusable LLM
+        answer is replaced by the heuristic one); renderers should show
+        result["answer"] once done. Time to first token is recorded in src.rag.metrics.
+        """
+        t0 = time.perf_counter()
+        first_token: List[float] = []
+
+        def token(text: str) -> Tuple[str, str]:
+            if not first_token:
+                first_token.append(time.perf_counter())
+            return "token", text
+
+        key = self._result_key(question, documents, pages)
+        result = cache.get_result(key)
+        if result is None:
+            plan = self._plan(question, documents, pages)
+            yield "citations", plan.citations
+            text: Optional[str] = None
+            if plan.prompt is not None:
+                stream = getattr(self.llm, 'stream', None)
                 try:
-                    self.llm = GeminiClient(config)
+                    pieces = []
+                    for piece in (stream(plan.prompt) if stream else [self.llm.generate(plan.prompt)]):
+                        pieces.append(piece)
+                        yield token(piece)
+                    text = "".join(pieces)
                 except Exception:
-                    self.llm = LocalLLM(config)
-            else:
-                self.llm = LocalLLM(config)
+                    if not plan.tolerant:
+                        raise
+            result = plan.finish(text)
+            cache.put_result(key, result)
+        else:
+            yield "citations", result.get("citations", [])
+        if not first_token:  # heuristic / cached answer: delivered in one piece
+            yield token(result.get("answer", ""))
+        metrics.record_answer((first_token[0] - t0) * 1000, (time.perf_counter() - t0) * 1000)
+        yield "done", result
 
-    def ask(self, question: str) -> Dict[str, Any]:
+    def _plan(self, question: str, documents: Optional[Sequence[str]] = None, pages: Optional[PageRange] = None,
+              retrieved: Optional[List[LCDocument]] = None) -> "_Plan":
         import re
         # Definition query fast-path (e.g., "what is saas?", "define indemnity")
         q_norm = question.strip().lower()
@@ -53,28 +259,21 @@ class QAChain:
             target_tokens = [definition_target]
             low_target = definition_target.lower()
             target_tokens.extend(acronyms.get(low_target, []))
-            # Collect all sentences across docstore once
             try:
-                all_docs = list(getattr(self.vs.docstore, '_dict', {}).values())
-                for d in all_docs:
-                    page = d.metadata.get('page')
-                    for sent in re.split(r"(?<=[.!?])\s+", d.page_content):
-                        s_clean = sent.strip()
-                        if not (10 < len(s_clean) < 420):
-                            continue
-                        low = s_clean.lower()
-                        if any(t in low for t in target_tokens):
-                            # definitional cue words
-                            if re.search(r"\b(is|means|refers to|shall mean)\b", low):
-                                # score: presence of cues + proximity of term
-                                score = 0
-                                for t in target_tokens:
-                                    if t in low:
-                                        score += 4
-                                if 'means' in low: score += 3
-                                if 'refers to' in low: score += 2
-                                if 'is' in low: score += 1
-                                definition_hits.append((score, page, s_clean))
+                for page, s_clean in self._definition_sentences(target_tokens, documents, pages):
+                    low = s_clean.lower()
+                    if any(t in low for t in target_tokens):
+                        # definitional cue words
+                        if re.search(r"\b(is|means|refers to|shall mean)\b", low):
+                            # score: presence of cues + proximity of term
+                            score = 0
+                            for t in target_tokens:
+                                if t in low:
+                                    score += 4
+                            if 'means' in low: score += 3
+                            if 'refers to' in low: score += 2
+                            if 'is' in low: score += 1
+                            definition_hits.append((score, page, s_clean))
                 if definition_hits:
                     definition_hits.sort(key=lambda x: (-x[0], len(x[2])))
                     top_def = definition_hits[0]
@@ -101,41 +300,30 @@ class QAChain:
                         tmp = tmp[:317].rstrip(',; ') + '...'
                     concise_def = tmp.strip()
                     citations = [{"page": page, "snippet": base_def[:300]}]
-                    is_stub = isinstance(self.llm, LocalLLM) and getattr(self.llm, 'pipe', None) is None
-                    if not is_stub:
+
+                    def finish_definition(refined: Optional[str]) -> Dict[str, Any]:
+                        refined = (refined or "").strip()
+                        if 15 < len(refined) < 400:
+                            return {"answer": refined, "citations": citations}
+                        # Fall back to heuristic concise version
+                        if 15 < len(concise_def) < 400:
+                            return {"answer": concise_def, "citations": citations}
+                        return {"answer": concise_def or base_def, "citations": citations}
+
+                    refine_prompt = None
+                    if can_generate(self.llm):
                         refine_prompt = f"Provide a concise plain-language definition of '{definition_target}' grounded strictly in this contract sentence, and optionally expand acronyms. Sentence: {base_def}\nAnswer:"
-                        try:
-                            refined = self.llm.generate(refine_prompt).strip()
-                            if 15 < len(refined) < 400:
-                                return {"answer": refined, "citations": citations}
-                        except Exception:
-                            pass
-                    # Fall back to heuristic concise version
-                    if 15 < len(concise_def) < 400:
-                        return {"answer": concise_def, "citations": citations}
-                    return {"answer": concise_def or base_def, "citations": citations}
+                    return _Plan(citations, refine_prompt, finish_definition)
             except Exception:
                 pass
         # 1. Retrieval
-        try:
-            docs = self.retriever.invoke(question)
-        except AttributeError:  # older API
-            docs = self.retriever.get_relevant_documents(question)
+        docs = retrieved if retrieved is not None else self.retriever.invoke(question, documents, pages)
 
         # 2. Token prep (light stemming)
-        q_low = question.lower()
-        stop = {"the","a","an","is","are","to","of","and","or","in","on","for","with","does","do","shall","may","which","how","please"}
-        raw_tokens = [t for t in re.findall(r"[a-zA-Z]{3,}", q_low) if t not in stop]
-        def stem(t:str):
-            for suf in ("ing","tion","ions","ed","es","ly","al","ment"):
-                if t.endswith(suf) and len(t) > len(suf)+2:
-                    return t[:-len(suf)]
-            return t
-        tokens = [stem(t) for t in raw_tokens]
-        # synonyms map
-        SYN = {"saas":["software as a service"],"terminate":["termination","end"],"payment":["fee","fees","charge"],"confidentiality":["confidential"],"liability":["liable"],"indemnity":["indemnify","indemnification"]}
-
-        # 3. Collect candidate sentences from retrieved docs (primary) or global if few
+        tokens = [stem(t) for t in words(question)]
+        SYN = SYNONYMS
+
+        # 3. Collect candidate sentences from the retrieved chunks
         def collect_sentences(doc_list):
             sents = []
             for d in doc_list:
@@ -146,10 +334,14 @@ class QAChain:
                         sents.append((page, s_clean))
             return sents
         candidates = collect_sentences(docs)
-        if len(candidates) < 5 and hasattr(self.vs, 'docstore'):  # broaden
+        # Hybrid retrieval already brings keyword matches; dense-only retrieval broadens to the
+        # whole (filtered) index when the retrieved chunks yield too few sentences
+        if len(candidates) < 5 and self.retriever.bm25 is None and hasattr(self.vs, 'docstore'):
             try:
-                all_docs = list(getattr(self.vs.docstore, '_dict', {}).values())
-                candidates = collect_sentences(all_docs)
+                from src.vectorstore.docstore import iter_documents
+                candidates = collect_sentences(
+                    d for _, d in iter_documents(self.vs) if matches_filter(d.metadata, documents, pages)
+                )
             except Exception:
                 pass
 
@@ -192,10 +384,13 @@ class QAChain:
                 context_blocks.append(f"[Page {page}] {snippet}")
                 citations.append({"page": page, "snippet": snippet})
             prompt = RAG_TEMPLATE.format(context="\n\n".join(context_blocks), question=question)
-            raw_answer = self.llm.generate(prompt).strip()
-            if raw_answer.lower().startswith("fallback (no local model)") or len(raw_answer) < 25:
-                raw_answer = "No grounded sentence match found for the question tokens."  # final fallback
-            return {"answer": raw_answer, "citations": citations}
+
+            def finish_chunks(raw_answer: Optional[str]) -> Dict[str, Any]:
+                raw_answer = (raw_answer or "").strip()
+                if raw_answer.lower().startswith("fallback (no local model)") or len(raw_answer) < 25:
+                    raw_answer = "No grounded sentence match found for the question tokens."  # final fallback
+                return {"answer": raw_answer, "citations": citations}
+            return _Plan(citations, prompt, finish_chunks, tolerant=False)
 
         # Prepare answer synthesis from top sentences
         citations = []
@@ -230,10 +425,11 @@ class QAChain:
         for t in sorted(set(tokens), key=len, reverse=True):
             if len(t) < 3: continue
             hl_answer = re.sub(rf"\b({re.escape(t)})\b", r"**\\1**", hl_answer, flags=re.I)
-        return {"answer": hl_answer, "citations": citations, "confidence": conf}
+        result = {"answer": hl_answer, "citations": citations, "confidence": conf}
+        return _Plan(citations, None, lambda _: result)
 
 
-def build_qa_chain(config: AppConfig, vs: FAISS | None):
+def build_qa_chain(config: AppConfig, vs: FAISS | None, sentences: Optional[SentenceIndex] = None, bm25: Optional[BM25Index] = None):
     if not vs:
         return None
-    return QAChain(config, vs)
+    return QAChain(config, vs, sentences=sentences, bm25=bm25)
@@ -1,5 +1,162 @@
 from __future__ import annotations
-from langchain_community.vectorstores import FAISS
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+import numpy as np
 
-def get_retriever(vs: FAISS, k: int = 5):
-    return vs.as_retriever(search_kwargs={"k": k})
+if TYPE_CHECKING:  # annotation only
+    from langchain_community.vectorstores import FAISS
+    from langchain.docstore.document import Document as LCDocument
+    from src.rag.bm25 import BM25Index
+
+PageRange = Tuple[int, int]
+FETCH_K = 20  # candidates taken from each of the dense / sparse lists before fusion
+RRF_K = 60  # reciprocal rank fusion constant (Cormack et al.)
+
+
+def matches_filter(metadata: dict, docs: Optional[Sequence[str]] = None, pages: Optional[PageRange] = None) -> bool:
+    """True if a chunk's metadata passes the document / inclusive page-range filter."""
+    if docs and metadata.get("doc") not in docs:
+        return False
+    if pages:
+        page = metadata.get("page") or 0
+        return pages[0] <= page <= pages[1]
+    return True
+
+
+class FilteredRetriever:
+    """Top-k retrieval over a FAISS store, optionally restricted to documents / a page range.
+
+    With a BM25 index the dense and sparse top-FETCH_K lists are merged by
+    reciprocal rank fusion (score = sum of 1 / (RRF_K + rank)); chunks found only by
+    BM25 are read from the docstore by id.
+
+    Filters become a FAISS IDSelector (a position range when the allowed chunks are
+    contiguous, which is the case for a single document, otherwise a bitmap), so the
+    index only scores allowed vectors: no over-fetching and post-filtering.
+    The position -> (document, page) layout is read once, on the first filtered
+    query; the QA chain is rebuilt whenever the index changes, so it never goes stale.
+    """
+
+    def __init__(self, vs: FAISS, k: int = 5, bm25: Optional[BM25Index] = None):
+        self.vs = vs
+        self.k = k
+        self.bm25 = bm25
+        self._layout: Optional[Tuple[List[str], np.ndarray, np.ndarray]] = None
+
+    def layout(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """(document names, per-position document code, per-position page)."""
+        if self._layout is None:
+            from src.vectorstore.docstore import iter_documents
+            meta = {doc_id: (d.metadata.get("doc"), d.metadata.get("page") or 0) for doc_id, d in iter_documents(self.vs)}
+            names: List[str] = []
+            codes = {}
+            n = self.vs.index.ntotal
+            doc_of = np.full(n, -1, dtype=np.int32)
+            page_of = np.zeros(n, dtype=np.int32)
+            for pos in range(n):
+                name, page = meta.get(self.vs.index_to_docstore_id.get(pos), (None, 0))
+                if name not in codes:
+                    codes[name] = len(names)
+                    names.append(name)
+                doc_of[pos] = codes[name]
+                page_of[pos] = page
+            self._layout = (names, doc_of, page_of)
+        return self._layout
+
+    def _selector(self, docs: Optional[Sequence[str]], pages: Optional[PageRange]):
+        import faiss  # type: ignore
+        names, doc_of, page_of = self.layout()
+        mask = np.ones(len(doc_of), dtype=bool)
+        if docs:
+            mask &= np.isin(doc_of, [i for i, name in enumerate(names) if name in set(docs)])
+        if pages:
+            mask &= (page_of >= pages[0]) & (page_of <= pages[1])
+        allowed = np.flatnonzero(mask)
+        if allowed.size == 0:
+            return None, None
+        lo, hi = int(allowed[0]), int(allowed[-1]) + 1
+        if hi - lo == allowed.size:
+            return faiss.IDSelectorRange(lo, hi), None
+        bits = np.packbits(mask, bitorder="little")
+        # The bitmap is not copied by FAISS: the caller keeps `bits` alive during the search
+        return faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits)), bits
+
+    def invoke(self, question: str, docs: Optional[Sequence[str]] = None, pages: Optional[PageRange] = None) -> List[LCDocument]:
+        return self.invoke_many([question], docs, pages)[0]
+
+    def invoke_many(self, questions: Sequence[str], docs: Optional[Sequence[str]] = None,
+                    pages: Optional[PageRange] = None) -> List[List[LCDocument]]:
+        """Top-k chunks for each question: one embedding batch and one multi-query FAISS search.
+
+        Chunks retrieved by several questions are read from the docstore once.
+        """
+        if not questions:
+            return []
+        loaded: Dict[str, LCDocument] = {}
+        if self.bm25 is None:
+            return [self._load(ids, loaded) for ids in self._dense_ids(questions, docs, pages, self.k)]
+        results = []
+        for question, dense in zip(questions, self._dense_ids(questions, docs, pages, FETCH_K)):
+            sparse = self.bm25.search(question, FETCH_K, docs, pages)
+            fused: dict = {}
+            for rank, doc_id in enumerate(dense):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            for rank, (cid, _) in enumerate(sparse):
+                fused[cid] = fused.get(cid, 0.0) + 1.0 / (RRF_K + rank + 1)
+            results.append(self._load(sorted(fused, key=fused.get, reverse=True), loaded, limit=self.k))
+        return results
+
+    def _load(self, ids: Sequence[str], loaded: Dict[str, LCDocument], limit: Optional[int] = None) -> List[LCDocument]:
+        """Documents for docstore ids (in order, skipping unknown ids), memoized in `loaded`."""
+        out = []
+        for doc_id in ids:
+            if doc_id not in loaded:
+                doc = self.vs.docstore.search(doc_id)
+                if isinstance(doc, str):  # "ID ... not found." from the docstore contract
+                    continue
+                loaded[doc_id] = doc
+            out.append(loaded[doc_id])
+            if limit is not None and len(out) == limit:
+                break
+        return out
+
+    def _query_vectors(self, questions: Sequence[str]) -> np.ndarray:
+        """Query embeddings, shared across sessions via the LRU in src.rag.cache; misses are embedded in one batch."""
+        from src.embeddings.embeddings import embed_queries, embedding_tag
+        from src.rag.cache import cached_query_vectors
+        embed = self.vs.embedding_function
+        # Query-side embedding (embed_query semantics), like the as_retriever path; skips the persistent chunk cache
+        vectors = cached_query_vectors(embedding_tag(embed), questions, lambda qs: embed_queries(embed, qs))
+        return np.asarray(vectors, dtype=np.float32).reshape(len(questions), -1)
+
+    def _dense_ids(self, questions: Sequence[str], docs: Optional[Sequence[str]], pages: Optional[PageRange],
+                   k: int) -> List[List[str]]:
+        """Docstore ids of the top-k chunks per question (chunks and docstore ids are the same for our stores)."""
+        import faiss  # type: ignore
+        params = None
+        if docs or pages:
+            from src.vectorstore.ann import search_params
+            selector, _bits = self._selector(docs, pages)  # _bits must outlive the search
+            if selector is None:
+                return [[] for _ in questions]
+            params = search_params(self.vs.index, selector)
+        queries = self._query_vectors(questions)
+        if getattr(self.vs, "_normalize_L2", False):
+            faiss.normalize_L2(queries)
+        k = min(k, self.vs.index.ntotal)
+        if k <= 0:
+            return [[] for _ in questions]
+        if params is None:
+            _, positions = self.vs.index.search(queries, k)
+        else:
+            _, positions = self.vs.index.search(queries, k, params=params)
+        id_of = self.vs.index_to_docstore_id
+        return [[id_of[int(pos)] for pos in row if pos >= 0] for row in positions]
+
+
+def get_retriever(vs: FAISS, k: int = 5, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  bm25: Optional[BM25Index] = None) -> FilteredRetriever:
+    """Top-k retriever (hybrid when `bm25` is given); nprobe / ef_search tune IVF / HNSW recall vs latency."""
+    if nprobe or ef_search:
+        from src.vectorstore.ann import set_search_params
+        set_search_params(vs.index, nprobe=nprobe, ef_search=ef_search)
+    return FilteredRetriever(vs, k=k, bm25=bm25)
@@ -0,0 +1,143 @@
+"""Precomputed sentence / definition index for the QA fast path.
+
+`QAChain.ask` answers "what is X / define X" from a single definitional
+sentence. Instead of re-splitting every chunk per question, each document's
+chunks are split once at indexing time into sentence spans (chunk id, start,
+end, page, definitional-cue flag) plus an inverted term -> sentence map.
+`DocSentences` are persisted next to the document's FAISS shard and combined
+per session in a `SentenceIndex`, which adds / drops whole documents when the
+upload set changes.
+
+Lookups return the sentences in which every word of the term is a token or
+a token prefix ("fee" also finds "fees"): a bisect over the document's sorted
+vocabulary per word, never a vocabulary scan. The caller applies the exact
+substring / cue checks to the few candidates.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from src.utils.types import Chunk
+
+VERSION = 1
+SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+CUE_RE = re.compile(r"\b(is|means|refers to|shall mean)\b")
+TOKEN_RE = re.compile(r"\w+")
+MIN_LEN, MAX_LEN = 10, 420  # exclusive bounds of the definition fast path
+
+
+def sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each stripped sentence, split exactly like re.split(SENT_SPLIT_RE)."""
+    pos = 0
+    bounds = [(m.start(), m.end()) for m in SENT_SPLIT_RE.finditer(text)] + [(len(text), len(text))]
+    for cut, nxt in bounds:
+        seg = text[pos:cut]
+        lead = len(seg) - len(seg.lstrip())
+        trail = len(seg) - len(seg.rstrip())
+        if cut - trail > pos + lead:
+            yield pos + lead, cut - trail
+        pos = nxt
+
+
+class DocSentences:
+    """Sentence spans of one document and its term -> sentence-id postings."""
+
+    def __init__(self, chunk_ids: List[str], spans: List[List[int]], postings: Dict[str, List[int]]):
+        self.chunk_ids = chunk_ids
+        self.spans = spans  # [chunk index, start, end, page, cue]
+        self.postings = postings
+        self.vocab = sorted(postings)  # prefix ranges for _with_word
+
+    @classmethod
+    def build(cls, chunks: Sequence[Chunk]) -> "DocSentences":
+        chunk_ids: List[str] = []
+        spans: List[List[int]] = []
+        postings: Dict[str, List[int]] = {}
+        for ci, chunk in enumerate(chunks):
+            chunk_ids.append(chunk.id)
+            for start, end in sentence_spans(chunk.content):
+                if not (MIN_LEN < end - start < MAX_LEN):
+                    continue
+                low = chunk.content[start:end].lower()
+                sid = len(spans)
+                spans.append([ci, start, end, chunk.page or 0, 1 if CUE_RE.search(low) else 0])
+                for term in set(TOKEN_RE.findall(low)):
+                    postings.setdefault(term, []).append(sid)
+        return cls(chunk_ids, spans, postings)
+
+    def _with_word(self, word: str) -> Set[int]:
+        """Sentences with a token that starts with `word`: the terms in [word, next prefix) of the sorted vocabulary."""
+        lo = bisect_left(self.vocab, word)
+        hi = bisect_left(self.vocab, word[:-1] + chr(ord(word[-1]) + 1), lo)
+        hits: Set[int] = set()
+        for term in self.vocab[lo:hi]:
+            hits.update(self.postings[term])
+        return hits
+
+    def candidates(self, phrases: Iterable[str]) -> List[int]:
+        """Cue sentences that may contain any of the phrases (sorted sentence ids)."""
+        found: Set[int] = set()
+        for phrase in phrases:
+            words = TOKEN_RE.findall(phrase.lower())
+            if not words:
+                continue
+            ids = self._with_word(words[0])
+            for word in words[1:]:
+                if not ids:
+                    break
+                ids &= self._with_word(word)
+            found |= ids
+        return sorted(sid for sid in found if self.spans[sid][4])
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "chunk_ids": self.chunk_ids, "spans": self.spans, "postings": self.postings}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DocSentences"]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != VERSION:
+            return None
+        return cls(data["chunk_ids"], data["spans"], data["postings"])
+
+
+class SentenceIndex:
+    """Per-session view: document name -> DocSentences, in upload order."""
+
+    def __init__(self):
+        self.docs: Dict[str, DocSentences] = {}
+
+    def sync(self, names: Sequence[str], load) -> "SentenceIndex":
+        """Drop documents not in `names` and add missing ones via `load(name) -> DocSentences`."""
+        for name in [n for n in self.docs if n not in names]:
+            del self.docs[name]
+        for name in names:
+            if name not in self.docs:
+                self.docs[name] = load(name)
+        return self
+
+    def definition_sentences(self, phrases: Sequence[str], docstore, documents: Optional[Sequence[str]] = None,
+                             pages: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, str]]:
+        """(page, sentence) for candidate definitional sentences; chunk text is fetched from `docstore`."""
+        for name, part in self.docs.items():
+            if documents and name not in documents:
+                continue
+            texts: Dict[int, str] = {}
+            for sid in part.candidates(phrases):
+                ci, start, end, page, _ = part.spans[sid]
+                if pages and not (pages[0] <= page <= pages[1]):
+                    continue
+                if ci not in texts:
+                    doc = docstore.search(part.chunk_ids[ci])
+                    texts[ci] = "" if isinstance(doc, str) else doc.page_content
+                sent = texts[ci][start:end]
+                if sent:
+                    yield page, sent
@@ -0,0 +1,34 @@
+"""Lexical rules shared by the QA sentence scorer and the BM25 index."""
+from __future__ import annotations
+import re
+from typing import Dict, List
+
+STOPWORDS = frozenset({"the", "a", "an", "is", "are", "to", "of", "and", "or", "in", "on", "for", "with", "does", "do", "shall", "may", "which", "how", "please"})
+SUFFIXES = ("ing", "tion", "ions", "ed", "es", "ly", "al", "ment")
+SYNONYMS: Dict[str, List[str]] = {
+    "saas": ["software as a service"],
+    "terminate": ["termination", "end"],
+    "payment": ["fee", "fees", "charge"],
+    "confidentiality": ["confidential"],
+    "liability": ["liable"],
+    "indemnity": ["indemnify", "indemnification"],
+}
+WORD_RE = re.compile(r"[a-zA-Z]{3,}")
+
+
+def stem(t: str) -> str:
+    """Light suffix stripping (first matching suffix, stem keeps >= 3 chars)."""
+    for suf in SUFFIXES:
+        if t.endswith(suf) and len(t) > len(suf) + 2:
+            return t[:-len(suf)]
+    return t
+
+
+def words(text: str) -> List[str]:
+    """Lower-cased words of 3+ letters without stopwords (unstemmed)."""
+    return [t for t in WORD_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def terms(text: str) -> List[str]:
+    """Stemmed index / query terms."""
+    return [stem(t) for t in words(text)]
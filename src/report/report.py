@@ -1,13 +1,13 @@
 from __future__ import annotations
 from io import BytesIO
-from reportlab.lib.pagesizes import LETTER
-from reportlab.pdfgen import canvas
 from typing import List, Dict
 from src.utils.types import ClauseResult, RedFlagResult, Document
 from src.utils.config import AppConfig
 
 
 def build_report(docs: List[Document], summaries, clauses: List[ClauseResult], redflags: List[RedFlagResult], qa_history, config: AppConfig) -> bytes:
+    from reportlab.lib.pagesizes import LETTER  # imported on export only
+    from reportlab.pdfgen import canvas
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=LETTER)
     width, height = LETTER
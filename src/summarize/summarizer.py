@@ -1,22 +1,20 @@
 from __future__ import annotations
 from typing import List, Dict
 from src.utils.config import AppConfig
-from src.llm.gemini import GeminiClient
-from src.llm.fallback import LocalLLM
+from src.llm.dispatch import map_generate
+from src.llm.packing import pack_prompts
+from src.llm.registry import can_generate, get_llm
 from src.utils.types import Document, Chunk
 
 SUM_PROMPT_PATH = "src/prompts/summarization.txt"
 with open(SUM_PROMPT_PATH, "r", encoding="utf-8") as f:
     SUM_TEMPLATE = f.read()
 
+REDUCE_PREFIX = (
+    "You will be given bullet lists extracted from a legal agreement. Consolidate them into 5-10 NEW, UNIQUE, plain-language bullets (each starting with '- '). Focus on: parties & purpose, key obligations, payment & fees, term & renewal/termination, liability & indemnity, confidentiality/IP, jurisdiction/dispute, unusual penalties or auto-renewal traps. Avoid repetition; no legalese; <=25 words per bullet.\n\n"
+)
+MAX_REDUCE_ROUNDS = 4  # the last round joins (and if needed truncates) whatever is left into one prompt
 
-def _get_llm(config: AppConfig):
-    if config.use_gemini:
-        try:
-            return GeminiClient(config)
-        except Exception:
-            return LocalLLM(config)
-    return LocalLLM(config)
 
 
 def heuristic_document_summary(text_blocks: List[str]) -> str:
@@ -75,30 +73,54 @@ def heuristic_document_summary(text_blocks: List[str]) -> str:
     return "\n".join(bullets[:10])
 
 
+def _dispatch(config: AppConfig, llm, prompts_by_doc: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Send every document's prompts in one map_generate call; stripped answers per document, in order."""
+    flat = map_generate(config, llm, [p for prompts in prompts_by_doc.values() for p in prompts])
+    out: Dict[str, List[str]] = {}
+    pos = 0
+    for name, prompts in prompts_by_doc.items():
+        out[name] = [resp.strip() for resp in flat[pos:pos + len(prompts)]]
+        pos += len(prompts)
+    return out
+
+
 def summarize_documents(config: AppConfig, docs: List[Document], chunks: List[Chunk]) -> Dict[str, Dict[str, str]]:
-    llm = _get_llm(config)
+    llm = get_llm(config)
     summaries: Dict[str, Dict[str, str]] = {}
     chunks_by_doc: Dict[str, List[str]] = {}
     for c in chunks:
         chunks_by_doc.setdefault(c.document_name, []).append(c.content)
 
+    use_heuristic = not can_generate(llm)
+    # Map stage: every document's prompts (packed to the token budget) are dispatched together
+    map_prompts: Dict[str, List[str]] = {}
     for doc in docs:
         parts = chunks_by_doc.get(doc.name, [])
-        use_heuristic = isinstance(llm, LocalLLM) and getattr(llm, 'pipe', None) is None
         if use_heuristic:
             summaries[doc.name] = {"bullets": heuristic_document_summary(parts)}
             continue
-
-        bullet_accum: List[str] = []
-        for i in range(0, len(parts), 6):
-            batch = parts[i:i+6]
-            prompt = SUM_TEMPLATE.format(text="\n\n".join(batch))
-            resp = llm.generate(prompt)
-            bullet_accum.append(resp.strip())
-        overall_prompt = (
-            "You will be given bullet lists extracted from a legal agreement. Consolidate them into 5-10 NEW, UNIQUE, plain-language bullets (each starting with '- '). Focus on: parties & purpose, key obligations, payment & fees, term & renewal/termination, liability & indemnity, confidentiality/IP, jurisdiction/dispute, unusual penalties or auto-renewal traps. Avoid repetition; no legalese; <=25 words per bullet.\n\n" + "\n".join(bullet_accum)
-        )
-        overall = llm.generate(overall_prompt)
+        map_prompts[doc.name] = pack_prompts(config, llm, "summary-map", lambda text: SUM_TEMPLATE.format(text=text), parts)
+    pending = _dispatch(config, llm, map_prompts)
+    # Reduce stage: consolidate each document's bullets; bullets beyond one prompt's budget are
+    # consolidated in groups first (hierarchically) so the final prompt never overflows
+    finals: Dict[str, str] = {}
+    for round_no in range(MAX_REDUCE_ROUNDS):
+        if not pending:
+            break
+        last = round_no == MAX_REDUCE_ROUNDS - 1
+        reduce_prompts = {
+            name: pack_prompts(config, llm, "summary-reduce", lambda text: REDUCE_PREFIX + text,
+                               ["\n".join(bullets)] if last else bullets, sep="\n")
+            for name, bullets in pending.items()
+        }
+        outputs = _dispatch(config, llm, reduce_prompts)
+        pending = {}
+        for name, out in outputs.items():
+            if len(out) <= 1:  # no text at all yields an empty summary
+                finals[name] = out[0] if out else ""
+            else:
+                pending[name] = out
+    for doc_name, overall in ((d.name, finals[d.name]) for d in docs if d.name in finals):
         # Normalize bullet formatting
         lines = [l.strip('- ').strip() for l in overall.splitlines() if l.strip()]
         # If model ignored structure, attempt category mapping
@@ -134,5 +156,5 @@ def summarize_documents(config: AppConfig, docs: List[Document], chunks: List[Ch
             cleaned.append('- ' + l[:160])
             if len(cleaned) >= 10:
                 break
-        summaries[doc.name] = {"bullets": "\n".join(cleaned)}
+        summaries[doc_name] = {"bullets": "\n".join(cleaned)}
     return summaries
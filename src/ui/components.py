@@ -1,9 +1,15 @@
 from __future__ import annotations
 import streamlit as st
-import pandas as pd
 from typing import List, Dict, Any
 from src.utils.config import AppConfig
 from src.utils.types import ClauseResult, RedFlagResult
+from src.ingest.cache import ingest_cache_stats
+from src.rag.cache import query_cache_stats
+from src.rag.metrics import qa_latency_stats
+from src.llm.cache import llm_cache_stats
+from src.llm.breaker import breaker_status
+from src.llm.packing import packing_stats
+from src.utils.warmup import warmup_status, cold_start_ms
 
 PRIMARY_COLOR = "#6A5ACD"  # slate purple
 ACCENT_COLOR = "#FFB347"
@@ -91,6 +97,27 @@ def sidebar(config: AppConfig):
     chunks_count = len(st.session_state.get('chunks', []))
     clause_count = len(st.session_state.get('clauses', []))
     risk_count = len(st.session_state.get('redflags', []))
+    ingest_stats = ingest_cache_stats()
+    qstats = query_cache_stats()
+    lat = qa_latency_stats()
+    llm_stats = llm_cache_stats()
+    pstats = packing_stats().values()
+    n_calls = sum(p['calls'] for p in pstats)
+    tok_per_call = f"{sum(p['avg_tokens'] * p['calls'] for p in pstats) / n_calls:.0f} • {n_calls} calls" if n_calls else "—"
+    breaker_pills = ""
+    for b in breaker_status():  # Gemini -> local failover circuit
+        state = f"open {b['retry_in_s']:.0f}s" if b['state'] == "open" else b['state']
+        breaker_pills += f"<div class='status-pill'><span>Circuit</span><span class='value'>{state} • {b['trips']} trips</span></div>"
+    ttft = f"{lat['ttft_p50_ms']:.0f} ms" if lat['count'] else "—"  # median time to first answer token
+    warm_pills = ""
+    if config.warmup:
+        icons = {"idle": "·", "loading": "…", "ready": "✓", "failed": "✗"}
+        warm = warmup_status()
+        cold = cold_start_ms()
+        warm_pills = (
+            f"<div class='status-pill'><span>Warm-up</span><span class='value'>emb {icons.get(warm['embed'], '?')} • llm {icons.get(warm['llm'], '?')}</span></div>"
+            f"<div class='status-pill'><span>Cold start</span><span class='value'>{f'{cold / 1000:.1f}s' if cold else '—'}</span></div>"
+        )
     progress_pct = 0
     if docs_count:
         stages = [docs_count>0, chunks_count>0, clause_count>0, risk_count>0]
@@ -103,6 +130,13 @@ def sidebar(config: AppConfig):
         f"<div class='status-pill'><span>Chunks</span><span class='value'>{chunks_count}</span></div>"
         f"<div class='status-pill'><span>Clauses</span><span class='value'>{clause_count}</span></div>"
         f"<div class='status-pill'><span>Risks</span><span class='value'>{risk_count}</span></div>"
+        f"<div class='status-pill'><span>Parse cache</span><span class='value'>{ingest_stats['hits']}h / {ingest_stats['misses']}m</span></div>"
+        f"<div class='status-pill'><span>Q&amp;A cache</span><span class='value'>ans {qstats['results']['hit_rate']:.0%} • emb {qstats['embeddings']['hit_rate']:.0%}</span></div>"
+        f"<div class='status-pill'><span>Prompt tok/call</span><span class='value'>{tok_per_call}</span></div>"
+        f"<div class='status-pill'><span>LLM cache</span><span class='value'>{llm_stats['hits']}h / {llm_stats['misses']}m</span></div>"
+        f"<div class='status-pill'><span>Q&amp;A TTFT</span><span class='value'>{ttft}</span></div>"
+        f"{breaker_pills}"
+        f"{warm_pills}"
         f"</div>",
         unsafe_allow_html=True,
     )
@@ -215,14 +249,49 @@ def redflags_tab(redflags: List[RedFlagResult], config: AppConfig):
         )
 
 
-def qa_tab(config: AppConfig, qa_chain, qa_history: List[Dict[str, Any]]):
+def _citation_spans(citations: List[Dict[str, Any]]) -> str:
+    cits = []
+    for c in citations:
+        raw_snip = c.get('snippet','')[:160]
+        snippet = raw_snip.replace('<','&lt;').replace('>','&gt;').replace('"','&quot;')
+        cits.append(f"<span class='citation' title=\"{snippet}\">p{c['page']}</span>")
+    return ' '.join(cits)
+
+
+def _checklist_questions(text: str, filename: str) -> List[str]:
+    """Questions from an uploaded checklist (.csv: first column, header row skipped)."""
+    if filename.lower().endswith(".csv"):
+        import csv
+        rows = [r[0].strip() for r in csv.reader(text.splitlines()) if r and r[0].strip()]
+        if rows and rows[0].lower() in ("question", "questions", "q"):
+            rows = rows[1:]
+    else:
+        rows = [line.strip() for line in text.splitlines() if line.strip()]
+    return rows
+
+
+def qa_tab(config: AppConfig, qa_chain, qa_history: List[Dict[str, Any]], doc_names: List[str] | None = None, max_page: int = 0):
     st.write("Ask document-grounded questions. Answers cite pages.")
     if not qa_chain:
         st.info("Build an index first by running analysis.")
         return
+    scope: List[str] = []
+    page_range = None
+    fcol1, fcol2 = st.columns([2, 1])
+    if doc_names and len(doc_names) > 1:
+        # Drop selections for documents that were removed since the last run
+        if 'qa_scope' in st.session_state:
+            st.session_state.qa_scope = [n for n in st.session_state.qa_scope if n in doc_names]
+        with fcol1:
+            scope = st.multiselect("Scope", doc_names, key="qa_scope", placeholder="All documents", help="Only retrieve from the selected contracts.")
+    if max_page > 1:
+        with fcol2:
+            lo, hi = st.slider("Pages", 1, max_page, (1, max_page), key="qa_pages", help="Only retrieve chunks starting on these pages.")
+        if (lo, hi) != (1, max_page):
+            page_range = (lo, hi)
     # Check if vectorstore appears empty (no internal docs)
     try:
-        if hasattr(qa_chain.vs, 'docstore') and not getattr(qa_chain.vs.docstore, '_dict', {}):
+        if getattr(getattr(qa_chain.vs, 'index', None), 'ntotal', 1) == 0:
             st.warning("Index contains 0 chunks. Upload PDFs and click Analyze first.")
     except Exception:
         pass
@@ -233,32 +302,72 @@ def qa_tab(config: AppConfig, qa_chain, qa_history: List[Dict[str, Any]]):
             submitted = st.form_submit_button("Ask", use_container_width=True)
         with colq2:
             clear_hist = st.form_submit_button("Clear History", use_container_width=True)
+    with st.expander("Run checklist"):
+        checklist = st.file_uploader(
+            "Question list (.txt: one per line, .csv: first column)", type=["txt", "csv"], key="qa_checklist",
+            help="Answers every question in one batch (shared retrieval, parallel synthesis).",
+        )
+        run_checklist = st.button("Run checklist", disabled=checklist is None, use_container_width=True)
     if clear_hist:
         qa_history.clear()
-    if submitted and question:
-        with st.spinner("Retrieving & generating answer..."):
+    if run_checklist and checklist is not None:
+        questions = _checklist_questions(checklist.getvalue().decode("utf-8", errors="ignore"), checklist.name)
+        if not questions:
+            st.warning("No questions found in the checklist.")
+        else:
+            bar = st.progress(0.0, text=f"Answering {len(questions)} questions...")
+            done = []
+
+            def _progress(i, _result):
+                done.append(i)
+                bar.progress(len(done) / len(questions), text=f"Answered {len(done)}/{len(questions)}")
+
             try:
-                result = qa_chain.ask(question)
-                qa_history.append({
-                    "q": question,
-                    "a": result.get("answer","(no answer)"),
-                    "citations": result.get("citations",[]),
-                    "confidence": result.get("confidence")
-                })
+                results = qa_chain.ask_many(questions, documents=scope or None, pages=page_range, on_result=_progress)
+                for q, result in zip(questions, results):
+                    qa_history.append({
+                        "q": q,
+                        "a": result.get("answer", "(no answer)"),
+                        "citations": result.get("citations", []),
+                        "confidence": result.get("confidence")
+                    })
             except Exception as e:
-                st.error(f"QA failure: {e}")
+                st.error(f"Checklist failure: {e}")
+            bar.empty()
+    if submitted and question:
+        # Streamed: citations appear as soon as retrieval is done, then the answer token by token
+        live = st.empty()
+        with live.container():
+            st.markdown(f"<div class='chat-q'>Q: {question}</div>", unsafe_allow_html=True)
+            cit_slot, answer_slot = st.empty(), st.empty()
+        answer_slot.markdown("<div class='chat-a'>…</div>", unsafe_allow_html=True)
+        try:
+            text = ""
+            result = None
+            for kind, payload in qa_chain.ask_stream(question, documents=scope or None, pages=page_range):
+                if kind == "citations":
+                    cit_slot.markdown(_citation_spans(payload), unsafe_allow_html=True)
+                elif kind == "token":
+                    text += payload
+                    answer_slot.markdown(f"<div class='chat-a'>{text}▌</div>", unsafe_allow_html=True)
+                else:
+                    result = payload
+            qa_history.append({
+                "q": question,
+                "a": result.get("answer","(no answer)"),
+                "citations": result.get("citations",[]),
+                "confidence": result.get("confidence")
+            })
+        except Exception as e:
+            st.error(f"QA failure: {e}")
+        live.empty()  # the finished answer is rendered with the history below
     for item in reversed(qa_history):
         st.markdown(f"<div class='chat-q'>Q: {item['q']}</div>", unsafe_allow_html=True)
         st.markdown(f"<div class='chat-a'>{item['a']}</div>", unsafe_allow_html=True)
         if item.get('confidence') is not None:
             st.markdown(f"<div style='font-size:.55rem;opacity:.6;margin-top:-4px;margin-bottom:2px;'>Confidence: {item['confidence']:.0f}</div>", unsafe_allow_html=True)
         if item['citations']:
-            cits = []
-            for c in item['citations']:
-                raw_snip = c.get('snippet','')[:160]
-                snippet = raw_snip.replace('<','&lt;').replace('>','&gt;').replace('"','&quot;')
-                cits.append(f"<span class='citation' title=\"{snippet}\">p{c['page']}</span>")
-            st.markdown(' '.join(cits), unsafe_allow_html=True)
+            st.markdown(_citation_spans(item['citations']), unsafe_allow_html=True)
         st.markdown("<div style='height:4px'></div>", unsafe_allow_html=True)
 
 
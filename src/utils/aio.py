@@ -0,0 +1,87 @@
+"""Process-wide asyncio runtime shared by the async LLM / QA APIs.
+
+One event loop per process runs on a daemon thread. Sync callers (Streamlit
+script threads, CLI helpers) submit coroutines with `run`; coroutines offload
+blocking work (FAISS search, local generation, SDKs without async support) with
+`to_thread` onto one shared, bounded pool. Async SDK clients (Gemini's gRPC aio
+channel) bind to the loop they first ran on, so keeping a single loop is also
+what lets every session reuse the same connections.
+"""
+from __future__ import annotations
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_LOCK = threading.Lock()
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            workers = int(os.getenv("ASYNC_WORKERS", "0")) or min(32, (os.cpu_count() or 1) + 4)
+            _POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aio-blocking")
+        return _POOL
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The shared event loop (started on first use)."""
+    global _LOOP
+    pool = _pool()
+    with _LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(pool)
+            threading.Thread(target=loop.run_forever, name="aio-loop", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run `coro` on the shared loop from synchronous code and wait for its result."""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("aio.run() called from the shared loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def to_thread(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking `fn` on the shared pool without blocking the loop."""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_pool(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+async def agenerate(llm, prompt: str, **kwargs: Any) -> str:
+    """`llm.agenerate` when the client has native async support, else its blocking generate on the pool."""
+    native = getattr(llm, "agenerate", None)
+    if native is not None:
+        return await native(prompt, **kwargs)
+    return await to_thread(llm.generate, prompt, **kwargs)
+
+
+async def gather_limited(items: Iterable[T], fn: Callable[[T], Awaitable[Any]], limit: int) -> List[Any]:
+    """await fn(item) for every item with at most `limit` in flight; results in input order."""
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def one(item: T):
+        async with sem:
+            return await fn(item)
+
+    return list(await asyncio.gather(*(one(item) for item in items)))
+
+
+async def agenerate_many(llm, prompts: Iterable[str], limit: int = 4) -> List[str]:
+    """Generate answers for independent prompts concurrently (at most `limit` in flight), in input order."""
+    return await gather_limited(prompts, lambda p: agenerate(llm, p), limit)
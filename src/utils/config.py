@@ -7,12 +7,42 @@ from dotenv import load_dotenv
 class AppConfig:
     use_gemini: bool = True
     embed_model: str = "intfloat/e5-small-v2"
+    embed_backend: str = "hf"  # "hf" (fp32 langchain_huggingface) | "quantized" (int8 CPU)
+    embed_batch_size: int = 32
+    embed_threads: int = 0  # 0 = torch default
     local_llm_model: str = "Qwen/Qwen2.5-7B-Instruct"
     max_tokens: int = 2048
     temperature: float = 0.3
     confidence_threshold: int = 65
     workspace_dir: str = "workspace_tmp"
     use_small_local: bool = False
+    pdf_workers: int = 1
+    ingest_cache_mb: int = 512
+    embed_cache_mb: int = 256
+    embed_cache_dtype: str = "float16"
+    hash_embed_signed: bool = False
+    hash_embed_bigrams: bool = False
+    warmup: bool = False
+    hybrid_retrieval: bool = True  # fuse BM25 with dense retrieval (reciprocal rank fusion)
+    query_cache_size: int = 1024  # LRU entries for query embeddings and QA answers each (0 = off)
+    llm_cache: bool = True  # persistent LLM response cache (workspace_dir/llm_cache.sqlite)
+    llm_cache_mb: int = 64
+    llm_cache_ttl_hours: int = 168  # 0 = entries never expire
+    prompt_budget_tokens: int = 6000  # input tokens per map / reduce prompt (capped by the model context)
+    llm_concurrency: int = 4  # map-stage prompts in flight (remote backend)
+    llm_rpm: int = 15  # remote requests / minute budget (0 = unlimited)
+    llm_tpm: int = 1000000  # remote prompt tokens / minute budget (0 = unlimited)
+    breaker_failures: int = 3  # consecutive Gemini failures that open the circuit (fail over to local)
+    breaker_cooldown_s: int = 60  # seconds before a half-open probe of Gemini
+    local_batch_size: int = 8  # map-stage prompts per local model.generate() call (1 = one at a time)
+    qa_batch_concurrency: int = 4  # concurrent answer syntheses (LLM calls) in QAChain.ask_many
+    ann_index: str = "auto"  # auto | flat | ivf | hnsw
+    ann_flat_max: int = 50000  # exact search up to this many vectors (auto mode)
+    ann_target: str = "recall"  # recall -> HNSW, latency -> IVF (auto mode, above ann_flat_max)
+    ann_nprobe: int = 16
+    ann_ef_search: int = 64
+    session_ttl_hours: int = 24  # workspace GC age for session namespaces / unused snapshots (0 = off)
+    mmap_min_vectors: int = 20000  # snapshot + memory-map assembled indexes at least this large (0 = off)
 
     @classmethod
     def from_env(cls) -> "AppConfig":
@@ -20,10 +50,40 @@ class AppConfig:
         return cls(
             use_gemini=os.getenv("USE_GEMINI", "true").lower() == "true",
             embed_model=os.getenv("EMBED_MODEL", "intfloat/e5-small-v2"),
+            embed_backend=os.getenv("EMBED_BACKEND", "hf").lower(),
+            embed_batch_size=int(os.getenv("EMBED_BATCH_SIZE", "32")),
+            embed_threads=int(os.getenv("EMBED_THREADS", "0")),
             local_llm_model=os.getenv("LOCAL_LLM_MODEL", "Qwen/Qwen2.5-7B-Instruct"),
             max_tokens=int(os.getenv("MAX_TOKENS", "2048")),
             temperature=float(os.getenv("TEMPERATURE", "0.3")),
             confidence_threshold=int(os.getenv("CONFIDENCE_THRESHOLD", "65")),
             workspace_dir=os.getenv("WORKSPACE_DIR", "workspace_tmp"),
             use_small_local=os.getenv("LOCAL_LLM_SMALL", "false").lower() == "true",
+            pdf_workers=int(os.getenv("PDF_WORKERS", "1")),
+            ingest_cache_mb=int(os.getenv("INGEST_CACHE_MB", "512")),
+            embed_cache_mb=int(os.getenv("EMBED_CACHE_MB", "256")),
+            embed_cache_dtype=os.getenv("EMBED_CACHE_DTYPE", "float16"),
+            hash_embed_signed=os.getenv("HASH_EMBED_SIGNED", "false").lower() == "true",
+            hash_embed_bigrams=os.getenv("HASH_EMBED_BIGRAMS", "false").lower() == "true",
+            warmup=os.getenv("WARMUP", "false").lower() == "true",
+            hybrid_retrieval=os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true",
+            query_cache_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            llm_cache=os.getenv("LLM_CACHE", "true").lower() == "true",
+            llm_cache_mb=int(os.getenv("LLM_CACHE_MB", "64")),
+            llm_cache_ttl_hours=int(os.getenv("LLM_CACHE_TTL_HOURS", "168")),
+            prompt_budget_tokens=int(os.getenv("PROMPT_BUDGET_TOKENS", "6000")),
+            llm_concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+            llm_rpm=int(os.getenv("LLM_RPM", "15")),
+            llm_tpm=int(os.getenv("LLM_TPM", "1000000")),
+            breaker_failures=int(os.getenv("BREAKER_FAILURES", "3")),
+            breaker_cooldown_s=int(os.getenv("BREAKER_COOLDOWN_S", "60")),
+            local_batch_size=int(os.getenv("LOCAL_BATCH_SIZE", "8")),
+            qa_batch_concurrency=int(os.getenv("QA_BATCH_CONCURRENCY", "4")),
+            ann_index=os.getenv("ANN_INDEX", "auto").lower(),
+            ann_flat_max=int(os.getenv("ANN_FLAT_MAX", "50000")),
+            ann_target=os.getenv("ANN_TARGET", "recall").lower(),
+            ann_nprobe=int(os.getenv("ANN_NPROBE", "16")),
+            ann_ef_search=int(os.getenv("ANN_EF_SEARCH", "64")),
+            mmap_min_vectors=int(os.getenv("MMAP_MIN_VECTORS", "20000")),
+            session_ttl_hours=int(os.getenv("SESSION_TTL_HOURS", "24")),
         )
@@ -69,9 +69,11 @@ def run_health_check(light: bool = True) -> Dict[str, Any]:
     results.append(HealthStatus("faiss-mini", faiss_ok, faiss_detail))
 
     aggregate = all(r.ok for r in results)
+    from src.llm.registry import provider_status  # state of already-built backends only; builds nothing
     return {
         "ok": aggregate,
         "components": [r.as_dict() for r in results],
+        "llm_providers": provider_status(),
     }
 
 
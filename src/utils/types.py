@@ -8,6 +8,7 @@ class Document:
     text: str
     pages: int
     pages_text: List[str] = field(default_factory=list)  # raw text per page (cleaned) for accurate citation mapping
+    sha256: str = ""  # content hash of the source PDF bytes (cache / shard key)
 
 @dataclass
 class Chunk:
@@ -0,0 +1,138 @@
+"""Multi-session / multi-worker safety for the shared workspace directory.
+
+Layout under `config.workspace_dir`:
+
+* faiss_shards/, faiss_snapshots/, ingest_cache/, embed_cache.sqlite - shared,
+  content addressed (a session can only hit entries for bytes it uploaded);
+* sessions/<session id>/ - per-session namespace (temporary docstores). Its
+  mtime is the heartbeat, refreshed on every script run.
+
+Shared directories are written with `atomic_dir` (temporary sibling + rename)
+under `file_lock` (fcntl.flock on a sibling `.lock` file), so concurrent
+workers never observe half-written indexes and build each shard only once.
+`gc_workspace` removes session namespaces, snapshots and abandoned temporary
+directories untouched for `session_ttl_hours`.
+"""
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from src.utils.config import AppConfig
+from src.utils.logging import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: single-worker deployments only
+    fcntl = None
+
+GC_INTERVAL_S = 600
+_LAST_GC = 0.0
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive inter-process lock on `<path>.lock`; yields False if non-blocking and busy."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a+") as f:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_dir(path: str) -> Iterator[str]:
+    """Yield a temporary sibling directory that is renamed to `path` on success.
+
+    If `path` appeared meanwhile (another writer won) the new copy is discarded.
+    """
+    parent = os.path.dirname(path) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    try:
+        yield tmp
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def touch(path: str) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def session_dir(config: AppConfig, session_id: str) -> str:
+    """Namespace directory of one UI session (created on demand, heartbeat refreshed)."""
+    path = os.path.join(config.workspace_dir, "sessions", session_id)
+    os.makedirs(path, exist_ok=True)
+    touch(path)
+    return path
+
+
+def _older_than(path: str, cutoff: float) -> bool:
+    try:
+        return os.path.getmtime(path) < cutoff
+    except OSError:
+        return False
+
+
+def gc_workspace(config: AppConfig, force: bool = False) -> Dict[str, int]:
+    """Delete stale session namespaces, unused snapshots and abandoned temp dirs.
+
+    Runs at most every GC_INTERVAL_S per process and in one process at a time.
+    """
+    global _LAST_GC
+    now = time.time()
+    ttl = config.session_ttl_hours * 3600
+    if ttl <= 0 or (not force and now - _LAST_GC < GC_INTERVAL_S):
+        return {}
+    _LAST_GC = now
+    cutoff = now - ttl
+    removed = {"sessions": 0, "snapshots": 0, "temp": 0}
+    root = config.workspace_dir
+    with file_lock(os.path.join(root, "gc"), blocking=False) as acquired:
+        if not acquired:
+            return {}
+        sessions = os.path.join(root, "sessions")
+        for name in os.listdir(sessions) if os.path.isdir(sessions) else []:
+            path = os.path.join(sessions, name)
+            if os.path.isdir(path) and _older_than(path, cutoff):
+                shutil.rmtree(path, ignore_errors=True)
+                removed["sessions"] += 1
+        snapshots = os.path.join(root, "faiss_snapshots")
+        for name in os.listdir(snapshots) if os.path.isdir(snapshots) else []:
+            path = os.path.join(snapshots, name)
+            if name.startswith(".tmp-") or not os.path.isdir(path) or not _older_than(path, cutoff):
+                continue
+            with file_lock(path, blocking=False) as free:
+                if free:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed["snapshots"] += 1
+        shard_root = os.path.join(root, "faiss_shards")
+        parents = [snapshots] + [os.path.join(shard_root, t) for t in (os.listdir(shard_root) if os.path.isdir(shard_root) else [])]
+        for parent in parents:
+            for name in os.listdir(parent) if os.path.isdir(parent) else []:
+                path = os.path.join(parent, name)
+                if name.startswith(".tmp-") and _older_than(path, cutoff):
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed["temp"] += 1
+    if any(removed.values()):
+        logger.info("Workspace GC removed %s", removed)
+    return removed
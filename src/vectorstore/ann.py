@@ -0,0 +1,108 @@
+"""FAISS index-type selection for the assembled QA index.
+
+Small corpora use exact search (IndexFlatL2, what FAISS.from_documents builds).
+Above `AppConfig.ann_flat_max` vectors the index switches to an approximate
+structure chosen by `AppConfig.ann_target`:
+
+* "recall"  -> HNSW (IndexHNSWFlat, M=32): best recall per query latency, more RAM.
+* "latency" -> IVF (IndexIVFFlat, nlist ~ sqrt(n)): cheapest build / memory, trained automatically.
+
+Search-time knobs (nprobe / efSearch) are applied through `set_search_params`.
+"""
+from __future__ import annotations
+import math
+from typing import Optional
+import numpy as np
+from src.utils.config import AppConfig
+
+KINDS = ("flat", "ivf", "hnsw")
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+
+
+def _faiss():
+    import faiss  # type: ignore
+    return faiss
+
+
+def choose_index_kind(n_vectors: int, config: AppConfig) -> str:
+    if config.ann_index in KINDS:
+        return config.ann_index
+    if n_vectors <= config.ann_flat_max:
+        return "flat"
+    return "hnsw" if config.ann_target == "recall" else "ivf"
+
+
+def index_kind(index) -> str:
+    faiss = _faiss()
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    try:
+        faiss.extract_index_ivf(index)
+        return "ivf"
+    except (RuntimeError, TypeError, ValueError):
+        return "flat"
+
+
+def _ivf_nlist(n_vectors: int) -> int:
+    # ~sqrt(n) lists, but keep >= 39 training points per centroid (FAISS guidance)
+    return max(1, min(int(math.sqrt(n_vectors)), n_vectors // 39, 65536))
+
+
+def make_index(vectors: np.ndarray, kind: str, config: AppConfig):
+    """Create an index of the given kind, train it if needed and add `vectors` (float32, C-contiguous)."""
+    faiss = _faiss()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif kind == "ivf" and n >= 39:
+        nlist = _ivf_nlist(n)
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist, faiss.METRIC_L2)
+        sample = vectors
+        if n > 256 * nlist:  # FAISS caps useful training points per centroid
+            sample = vectors[np.random.default_rng(0).choice(n, 256 * nlist, replace=False)]
+        index.train(sample)
+    else:
+        index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    set_search_params(index, config.ann_nprobe, config.ann_ef_search)
+    return index
+
+
+def index_vectors(index) -> np.ndarray:
+    """Return every stored vector in id order (used to re-assemble without re-embedding)."""
+    faiss = _faiss()
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    if index_kind(index) == "ivf":
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def set_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Apply query-time recall / latency knobs; ignored for exact (flat) indexes."""
+    faiss = _faiss()
+    kind = index_kind(index)
+    if kind == "ivf" and nprobe:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(int(nprobe), ivf.nlist)
+    elif kind == "hnsw" and ef_search:
+        index.hnsw.efSearch = int(ef_search)
+
+
+def search_params(index, selector):
+    """Per-query SearchParameters restricted to `selector`, carrying the index's current nprobe / efSearch."""
+    faiss = _faiss()
+    kind = index_kind(index)
+    if kind == "ivf":
+        params = faiss.SearchParametersIVF()
+        params.nprobe = faiss.extract_index_ivf(index).nprobe
+    elif kind == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = index.hnsw.efSearch
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params
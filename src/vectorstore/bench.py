@@ -0,0 +1,142 @@
+"""Vector store micro-benchmarks (manual use, not part of the app).
+
+    python -m src.vectorstore.bench ann [n_vectors] [n_queries]
+    python -m src.vectorstore.bench load [n_chunks]
+
+`ann` builds a synthetic 384-d corpus (Gaussian mixture, roughly the shape of
+sentence embeddings of contract chunks), takes exact IndexFlatL2 results as
+ground truth and reports recall@10 and per-query latency for IVF across nprobe
+values and for HNSW across efSearch values.
+
+`load` compares cold load time and RSS growth of FAISS.load_local against the
+memory-mapped read-only snapshot (src.vectorstore.mmap_store), each in a fresh
+subprocess, for an index of n_chunks ~1,100-character chunks (default 100k).
+"private MB" (RssAnon) is memory a session does not share; mapped index pages
+count towards RSS but live once in the page cache for all sessions.
+"""
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List, Tuple
+import numpy as np
+from src.utils.config import AppConfig
+from src.vectorstore.ann import make_index, set_search_params
+
+K = 10
+
+
+def synthetic_vectors(n: int, dim: int = 384, clusters: int = 200, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    assign = rng.integers(0, clusters, size=n)
+    vecs = centers[assign] + 1.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return np.ascontiguousarray(vecs, dtype=np.float32)
+
+
+def _search(index, queries: np.ndarray) -> Tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    _, ids = index.search(queries, K)
+    return ids, (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def _recall(truth: np.ndarray, got: np.ndarray) -> float:
+    return float(np.mean([len(set(t) & set(g)) / K for t, g in zip(truth, got)]))
+
+
+def bench_ann(n_vectors: int = 100_000, n_queries: int = 200) -> List[Dict[str, object]]:
+    config = AppConfig.from_env()
+    data = synthetic_vectors(n_vectors + n_queries)
+    vectors, queries = data[:n_vectors], data[n_vectors:]
+    rows: List[Dict[str, object]] = []
+
+    t0 = time.perf_counter()
+    flat = make_index(vectors, "flat", config)
+    build = time.perf_counter() - t0
+    truth, ms = _search(flat, queries)
+    rows.append({"index": "flat", "param": "-", "build_s": build, "recall": 1.0, "ms_per_query": ms})
+
+    for kind, knob, values in (("ivf", "nprobe", (1, 4, 8, 16, 32, 64)), ("hnsw", "efSearch", (16, 32, 64, 128, 256))):
+        t0 = time.perf_counter()
+        index = make_index(vectors, kind, replace(config, ann_nprobe=1, ann_ef_search=16))
+        build = time.perf_counter() - t0
+        for value in values:
+            if kind == "ivf":
+                set_search_params(index, nprobe=value)
+            else:
+                set_search_params(index, ef_search=value)
+            got, ms = _search(index, queries)
+            rows.append({"index": kind, "param": f"{knob}={value}", "build_s": build, "recall": _recall(truth, got), "ms_per_query": ms})
+    return rows
+
+
+_LOAD_PROBE = """
+import json, sys, time
+def mem_mb(field):
+    with open("/proc/self/status") as f:
+        return int(next(l for l in f if l.startswith(field)).split()[1]) / 1024
+def rss_mb():
+    return mem_mb("VmRSS:")
+from langchain_community.vectorstores import FAISS
+from src.embeddings.embeddings import HashingEmbedding
+from src.vectorstore.mmap_store import load_readonly
+import faiss, numpy as np
+mode, path = sys.argv[1], sys.argv[2]
+embed = HashingEmbedding()
+r0, a0 = rss_mb(), mem_mb("RssAnon:"); t0 = time.perf_counter()
+vs = FAISS.load_local(path, embed, allow_dangerous_deserialization=True) if mode == "load_local" else load_readonly(path, embed)
+load_ms = (time.perf_counter() - t0) * 1000; r1 = rss_mb()
+t0 = time.perf_counter()
+for q in ("termination notice", "liability cap", "payment terms"):
+    vs.similarity_search(q, k=5)
+query_ms = (time.perf_counter() - t0) * 1000 / 3
+print(json.dumps({"load_ms": load_ms, "rss_load_mb": r1 - r0, "rss_query_mb": rss_mb() - r0, "private_mb": mem_mb("RssAnon:") - a0, "query_ms": query_ms}))
+"""
+
+
+def bench_load(n_chunks: int = 100_000) -> Dict[str, Dict[str, float]]:
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain.docstore.document import Document as LCDocument
+    from src.embeddings.bench import synthetic_corpus
+    from src.embeddings.embeddings import HashingEmbedding
+    from src.vectorstore.mmap_store import save_readonly
+
+    embed = HashingEmbedding()
+    texts = synthetic_corpus(n_chunks)
+    ids = [f"c{i}" for i in range(n_chunks)]
+    index = make_index(embed.embed_matrix(texts), "flat", AppConfig.from_env())
+    docs = {i: LCDocument(page_content=t, metadata={"chunk_id": i, "doc": f"doc{n // 500}.pdf", "page": n % 40}) for n, (i, t) in enumerate(zip(ids, texts))}
+    vs = FAISS(embed, index, InMemoryDocstore(docs), dict(enumerate(ids)))
+    root = tempfile.mkdtemp(prefix="vs-bench-")
+    vs.save_local(os.path.join(root, "pickled"))
+    save_readonly(vs, os.path.join(root, "snapshot"))
+    results = {}
+    for mode, sub in (("load_local", "pickled"), ("mmap", "snapshot")):
+        out = subprocess.run([sys.executable, "-c", _LOAD_PROBE, mode, os.path.join(root, sub)], capture_output=True, text=True, check=True)
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+if __name__ == "__main__":  # Manual invocation helper
+    mode = sys.argv[1] if len(sys.argv) > 1 else "ann"
+    if mode == "ann":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        q = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        print(f"ANN recall@{K} vs exact search on {n:,} x 384-d vectors, {q} queries:")
+        print(f"  {'index':<6} {'param':<14} {'build s':>8} {'recall':>8} {'ms/query':>9}")
+        for r in bench_ann(n, q):
+            print(f"  {r['index']:<6} {r['param']:<14} {r['build_s']:>8.2f} {r['recall']:>8.3f} {r['ms_per_query']:>9.3f}")
+    elif mode == "load":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        print(f"Cold load of a {n:,}-chunk index (fresh process each):")
+        print(f"  {'mode':<11} {'load ms':>9} {'RSS load MB':>12} {'RSS +3q MB':>11} {'private MB':>11} {'ms/query':>9}")
+        for label, r in bench_load(n).items():
+            print(f"  {label:<11} {r['load_ms']:>9.1f} {r['rss_load_mb']:>12.1f} {r['rss_query_mb']:>11.1f} {r['private_mb']:>11.1f} {r['query_ms']:>9.2f}")
+    else:
+        sys.exit(f"unknown mode: {mode}")
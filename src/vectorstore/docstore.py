@@ -0,0 +1,109 @@
+"""Disk-backed chunk docstore for the session QA index.
+
+LangChain's InMemoryDocstore keeps every chunk's text and metadata in a dict,
+so resident memory grows with corpus text. `SqliteDocstore` stores chunks in a
+SQLite file next to the vectors: lookups go by chunk id and bulk scans
+(`iter_documents`) stream rows in batches over a separate read connection.
+It implements `AddableMixin`, so `FAISS.add_embeddings`, `merge_from` and
+`delete` keep working unchanged.
+
+Stores created with `temporary=True` (one per assembled index) delete their
+file when the owning vector store is garbage collected.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import uuid
+import weakref
+from typing import Dict, Iterator, List, Tuple
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain.docstore.document import Document as LCDocument
+
+SCAN_BATCH = 256
+
+
+def _remove_db(conn: sqlite3.Connection, path: str) -> None:
+    try:
+        conn.close()
+    except Exception:  # pragma: no cover
+        pass
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+def _row_to_doc(text: str, metadata: str) -> LCDocument:
+    return LCDocument(page_content=text, metadata=json.loads(metadata))
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+    def __init__(self, path: str, temporary: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+        self._conn.commit()
+        if temporary:
+            weakref.finalize(self, _remove_db, self._conn, path)
+
+    @classmethod
+    def temporary(cls, root: str) -> "SqliteDocstore":
+        return cls(os.path.join(root, f"{uuid.uuid4().hex}.sqlite"), temporary=True)
+
+    def add(self, texts: Dict[str, LCDocument]) -> None:
+        rows = [(i, d.page_content, json.dumps(d.metadata)) for i, d in texts.items()]
+        with self._lock:
+            try:
+                self._conn.executemany("INSERT INTO chunks VALUES (?, ?, ?)", rows)
+            except sqlite3.IntegrityError as e:
+                self._conn.rollback()
+                raise ValueError(f"Tried to add ids that already exist: {e}") from e
+            self._conn.commit()
+
+    def delete(self, ids: List) -> None:
+        with self._lock:
+            for start in range(0, len(ids), 500):  # stay below SQLite's variable limit
+                part = list(ids[start:start + 500])
+                self._conn.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(part))})", part)
+            self._conn.commit()
+
+    def search(self, search: str):
+        with self._lock:
+            row = self._conn.execute("SELECT text, metadata FROM chunks WHERE id=?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."  # same contract as InMemoryDocstore
+        return _row_to_doc(*row)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def iter_documents(self) -> Iterator[Tuple[str, LCDocument]]:
+        """Stream (id, document) in insertion order without holding the store lock."""
+        # Read-only URI: a store whose file was garbage collected errors instead of reading as empty
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+        try:
+            cur = conn.execute("SELECT id, text, metadata FROM chunks ORDER BY rowid")
+            while True:
+                rows = cur.fetchmany(SCAN_BATCH)
+                if not rows:
+                    break
+                for doc_id, text, metadata in rows:
+                    yield doc_id, _row_to_doc(text, metadata)
+        finally:
+            conn.close()
+
+
+def iter_documents(vs) -> Iterator[Tuple[str, LCDocument]]:
+    """(id, document) pairs of any store without assuming an in-memory dict."""
+    store = vs.docstore
+    if hasattr(store, "iter_documents"):
+        yield from store.iter_documents()
+    else:
+        yield from getattr(store, "_dict", {}).items()
@@ -1,25 +1,229 @@
 from __future__ import annotations
+import hashlib
 import os
-from typing import List
+import re
+import shutil
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document as LCDocument
 from langchain.embeddings.base import Embeddings
+from src.embeddings.embeddings import embedding_tag
+from src.rag.bm25 import BM25Index, DocTerms
+from src.rag.sentences import DocSentences, SentenceIndex
+from src.vectorstore.ann import choose_index_kind, index_kind, index_vectors, make_index
+from src.vectorstore.docstore import SqliteDocstore, iter_documents
+from src.vectorstore.mmap_store import load_readonly, materialize, save_readonly
 from src.utils.config import AppConfig
-from src.utils.types import Chunk
+from src.utils.logging import logger
+from src.utils.types import Chunk, Document
+from src.utils.workspace import atomic_dir, file_lock, touch
+
+
+def _to_lc_docs(chunks: List[Chunk]) -> List[LCDocument]:
+    return [LCDocument(page_content=c.content, metadata={"chunk_id": c.id, "doc": c.document_name, "page": c.page}) for c in chunks]
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.sha256 or hashlib.sha256(doc.text.encode("utf-8")).hexdigest()
+
 
 class FaissStoreManager:
-    def __init__(self, config: AppConfig):
+    """Per-document FAISS shards merged on demand into the session's QA index.
+
+    Every document is embedded once into its own small index under
+    `<workspace>/faiss_shards/<embedding tag>/<content sha256>/`. Shards are content
+    addressed, so they are reused across sessions and renames; the QA index for any
+    subset of documents is assembled by merging the selected shards (no re-embedding).
+    Shards are always exact (flat); the assembled index switches to IVF / HNSW once it
+    grows past `ann_flat_max` vectors (see src.vectorstore.ann). Assembled indexes of at
+    least `mmap_min_vectors` vectors are snapshotted under `<workspace>/faiss_snapshots/`
+    and reopened memory-mapped, so sessions over the same documents share one copy.
+    Smaller (mutable) indexes keep chunk text in a temporary SQLite docstore under
+    `<namespace>/docstores/` rather than in memory; `namespace` is the caller's
+    session directory (src.utils.workspace.session_dir), the workspace root if None.
+    Shared shard / snapshot writes are atomic and serialized across processes.
+    """
+
+    def __init__(self, config: AppConfig, namespace: Optional[str] = None):
         self.config = config
         os.makedirs(config.workspace_dir, exist_ok=True)
-        self.index_path = os.path.join(config.workspace_dir, "faiss_index")
+        self.shard_root = os.path.join(config.workspace_dir, "faiss_shards")
+        self.snapshot_root = os.path.join(config.workspace_dir, "faiss_snapshots")
+        self.docstore_root = os.path.join(namespace or config.workspace_dir, "docstores")
+
+    def _shard_path(self, doc: Document, embed: Embeddings) -> str:
+        tag = re.sub(r"[^A-Za-z0-9_.-]+", "_", embedding_tag(embed))
+        return os.path.join(self.shard_root, tag, _doc_key(doc))
 
-    def build_index(self, chunks: List[Chunk], embed: Embeddings, force_rebuild: bool = False):
-        if os.path.exists(self.index_path) and not force_rebuild:
+    def shard(self, doc: Document, chunks: List[Chunk], embed: Embeddings) -> Optional[FAISS]:
+        """Load the document's shard, building (and persisting) it on first use."""
+        if not chunks:
+            return None
+        path = self._shard_path(doc, embed)
+        vs = self._load_shard(path, embed)
+        if vs is None:
+            with file_lock(path):
+                vs = self._load_shard(path, embed)  # built by another session meanwhile?
+                if vs is None:
+                    # Chunk ids double as docstore ids so documents can later be removed without a rebuild
+                    vs = FAISS.from_documents(_to_lc_docs(chunks), embed, ids=[c.id for c in chunks])
+                    shutil.rmtree(path, ignore_errors=True)  # unreadable leftover
+                    with atomic_dir(path) as tmp:
+                        vs.save_local(tmp)
+        # Shards are keyed by content; label vectors with the name used in this workspace
+        for d in vs.docstore._dict.values():
+            d.metadata["doc"] = doc.name
+        return vs
+
+    def _doc_part(self, doc: Document, chunks: List[Chunk], embed: Embeddings, filename: str, cls):
+        """Per-document lexical index stored in the document's shard directory (built on first use)."""
+        path = self._shard_path(doc, embed)
+        cached = cls.load(os.path.join(path, filename))
+        if cached is not None and len(cached.chunk_ids) == len(chunks):
+            return cached
+        part = cls.build(chunks)
+        if os.path.isdir(path):
             try:
-                return FAISS.load_local(self.index_path, embed, allow_dangerous_deserialization=True)
-            except Exception:
-                pass
-        docs = [LCDocument(page_content=c.content, metadata={"chunk_id": c.id, "doc": c.document_name, "page": c.page}) for c in chunks]
-        vs = FAISS.from_documents(docs, embed)
-        vs.save_local(self.index_path)
+                part.save(os.path.join(path, filename))
+            except OSError as e:  # pragma: no cover - read-only workspace
+                logger.warning("Could not persist %s for %s: %s", filename, doc.name, e)
+        return part
+
+    def _sync(self, index, docs: List[Document], chunks: List[Chunk], embed: Embeddings, filename: str, cls):
+        by_name = {d.name: d for d in docs}
+        by_doc: Dict[str, List[Chunk]] = {}
+        for c in chunks:
+            by_doc.setdefault(c.document_name, []).append(c)
+        names = [d.name for d in docs if by_doc.get(d.name)]
+        return index.sync(names, lambda name: self._doc_part(by_name[name], by_doc[name], embed, filename, cls))
+
+    def sentence_index(self, docs: List[Document], chunks: List[Chunk], embed: Embeddings, index: Optional[SentenceIndex] = None) -> SentenceIndex:
+        """Bring the sentence / definition index in line with `docs`: only added documents are loaded / built."""
+        return self._sync(index or SentenceIndex(), docs, chunks, embed, "sentences.json", DocSentences)
+
+    def bm25_index(self, docs: List[Document], chunks: List[Chunk], embed: Embeddings, index: Optional[BM25Index] = None) -> BM25Index:
+        """Bring the BM25 index in line with `docs` (incremental, like sentence_index)."""
+        return self._sync(index or BM25Index(), docs, chunks, embed, "bm25.json", DocTerms)
+
+    def _load_shard(self, path: str, embed: Embeddings) -> Optional[FAISS]:
+        if not os.path.exists(path):
+            return None
+        try:
+            return FAISS.load_local(path, embed, allow_dangerous_deserialization=True)
+        except Exception as e:
+            logger.warning("Rebuilding unreadable shard %s: %s", path, e)
+            return None
+
+    def _new_docstore(self) -> SqliteDocstore:
+        return SqliteDocstore.temporary(self.docstore_root)
+
+    def _to_disk(self, vs: FAISS) -> FAISS:
+        """Move an in-memory docstore (fresh shard) into a temporary SQLite docstore."""
+        if isinstance(vs.docstore, InMemoryDocstore):
+            store = self._new_docstore()
+            store.add(vs.docstore._dict)
+            vs.docstore = store
         return vs
+
+    def _assemble(self, parts: List[FAISS], embed: Embeddings, kind: str) -> FAISS:
+        """Build a `kind` index from the stored vectors of `parts` (no re-embedding)."""
+        vectors = np.vstack([index_vectors(p.index) for p in parts])
+        docstore = self._new_docstore()
+        mapping: Dict[int, str] = {}
+        for p in parts:
+            batch: Dict[str, LCDocument] = {}
+            for pos in range(p.index.ntotal):
+                doc_id = p.index_to_docstore_id[pos]
+                mapping[len(mapping)] = doc_id
+                batch[doc_id] = p.docstore.search(doc_id)
+            docstore.add(batch)
+        return FAISS(embed, make_index(vectors, kind, self.config), docstore, mapping)
+
+    def _combine(self, parts: List[FAISS], embed: Embeddings) -> Optional[FAISS]:
+        parts = [p for p in parts if p is not None and p.index.ntotal]
+        if not parts:
+            return None
+        if len(parts) > 1:
+            parts = [materialize(p, self._new_docstore) for p in parts]
+        kind = choose_index_kind(sum(p.index.ntotal for p in parts), self.config)
+        base = parts[0]
+        if kind == "flat" and all(index_kind(p.index) == "flat" for p in parts):
+            base = self._to_disk(base)
+            for part in parts[1:]:
+                base.merge_from(part)
+            return base
+        if index_kind(base.index) == kind:
+            base = self._to_disk(base)
+            # Trained IVF / HNSW accept appended vectors; only the new parts are copied
+            for part in parts[1:]:
+                ids = [part.index_to_docstore_id[i] for i in range(part.index.ntotal)]
+                docs = [part.docstore.search(i) for i in ids]
+                base.add_embeddings(list(zip([d.page_content for d in docs], index_vectors(part.index))), [d.metadata for d in docs], ids)
+            return base
+        logger.info("Assembling %s index over %d vectors", kind, sum(p.index.ntotal for p in parts))
+        return self._assemble(parts, embed, kind)
+
+    def build_index(self, docs: List[Document], chunks: List[Chunk], embed: Embeddings, selected: Optional[Iterable[str]] = None):
+        """Combine the shards of `selected` documents (all when None) into one in-memory index."""
+        wanted = set(selected) if selected is not None else None
+        by_doc: Dict[str, List[Chunk]] = {}
+        for c in chunks:
+            by_doc.setdefault(c.document_name, []).append(c)
+        picked = [doc for doc in docs if by_doc.get(doc.name) and (wanted is None or doc.name in wanted)]
+        n_chunks = sum(len(by_doc[doc.name]) for doc in picked)
+        snapshot = None
+        if self.config.mmap_min_vectors and n_chunks >= self.config.mmap_min_vectors:
+            snapshot = self._snapshot_path(picked, embed, choose_index_kind(n_chunks, self.config))
+            with file_lock(snapshot):
+                if os.path.exists(snapshot):
+                    try:
+                        vs = load_readonly(snapshot, embed)
+                        touch(snapshot)  # keeps it from workspace GC
+                        return vs
+                    except Exception as e:
+                        logger.warning("Ignoring unreadable snapshot %s: %s", snapshot, e)
+                        snapshot = None
+                vs = self._combine([self.shard(doc, by_doc[doc.name], embed) for doc in picked], embed)
+                if snapshot and vs is not None:
+                    try:
+                        save_readonly(vs, snapshot)
+                        return load_readonly(snapshot, embed)
+                    except Exception as e:  # pragma: no cover - disk full / permissions
+                        logger.warning("Snapshot write failed, keeping index in memory: %s", e)
+                return vs
+        return self._combine([self.shard(doc, by_doc[doc.name], embed) for doc in picked], embed)
+
+    def _snapshot_path(self, docs: List[Document], embed: Embeddings, kind: str) -> str:
+        # Names are part of the key because chunk metadata carries the upload name
+        key = "\n".join(sorted(f"{_doc_key(d)}:{d.name}" for d in docs))
+        digest = hashlib.sha256(f"{embedding_tag(embed)}|{kind}|{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.snapshot_root, digest[:32])
+
+    def add_documents(self, vs: FAISS | None, docs: List[Document], chunks: List[Chunk], embed: Embeddings):
+        """Add the (possibly cached) shards of newly added documents to vs."""
+        added = self.build_index(docs, chunks, embed)
+        return self._combine([vs, added], embed)
+
+    def remove_documents(self, vs: FAISS | None, doc_names: Iterable[str]):
+        """Drop every vector belonging to the named documents (no re-embedding)."""
+        names = set(doc_names)
+        if vs is None or not names:
+            return vs
+        vs = materialize(vs, self._new_docstore)
+        ids = {doc_id for doc_id, d in iter_documents(vs) if d.metadata.get("doc") in names}
+        if not ids:
+            return vs
+        if index_kind(vs.index) == "flat":
+            vs.delete(list(ids))
+            return vs
+        # HNSW cannot remove ids (and IVF removal breaks positional ids): rebuild from the kept vectors
+        keep = [pos for pos in range(vs.index.ntotal) if vs.index_to_docstore_id[pos] not in ids]
+        kept_ids = [vs.index_to_docstore_id[pos] for pos in keep]
+        if not keep:
+            return None
+        vectors = index_vectors(vs.index)[keep]
+        kind = choose_index_kind(len(keep), self.config)
+        vs.docstore.delete(list(ids))
+        return FAISS(vs.embedding_function, make_index(vectors, kind, self.config), vs.docstore, dict(enumerate(kept_ids)))
@@ -0,0 +1,128 @@
+"""Read-only, memory-mapped snapshots of an assembled QA index.
+
+`FAISS.load_local` reads the whole index and unpickles every chunk into each
+Streamlit session. A snapshot directory instead holds:
+
+* index.faiss          - written with faiss.write_index and read back with
+                         IO_FLAG_MMAP_IFC | IO_FLAG_READ_ONLY, so vector data
+                         is paged in on demand and shared across processes /
+                         sessions through the OS page cache;
+* chunks.jsonl         - one JSON record per index position (id, text, metadata);
+* chunks.offsets.npy   - byte offsets into chunks.jsonl (n + 1 entries);
+* ids.json             - docstore id per index position.
+
+`LazyDocstore` decodes a record only when a search returns its position.
+Snapshots are immutable: mutating callers `materialize` an in-memory copy first.
+"""
+from __future__ import annotations
+import json
+import mmap
+import os
+import threading
+from typing import Callable, Iterator, List, Tuple
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore
+from langchain.docstore.document import Document as LCDocument
+from langchain.embeddings.base import Embeddings
+from src.utils.workspace import atomic_dir
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunks.offsets.npy"
+IDS_FILE = "ids.json"
+
+
+def _faiss():
+    import faiss  # type: ignore
+    return faiss
+
+
+class LazyDocstore(Docstore):
+    """Read-only docstore over chunks.jsonl; records are decoded per lookup."""
+
+    def __init__(self, path: str, ids: List[str]):
+        self.path = path
+        self.ids = ids
+        self._pos = {doc_id: n for n, doc_id in enumerate(ids)}
+        self._lock = threading.Lock()
+        self._mm = None
+        self._offsets = None
+
+    def _open(self):
+        with self._lock:
+            if self._mm is None:
+                self._offsets = np.load(os.path.join(self.path, OFFSETS_FILE), mmap_mode="r")
+                with open(os.path.join(self.path, CHUNKS_FILE), "rb") as f:
+                    self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm, self._offsets
+
+    def _read(self, pos: int) -> LCDocument:
+        mm, offsets = self._open()
+        rec = json.loads(mm[int(offsets[pos]):int(offsets[pos + 1])])
+        return LCDocument(page_content=rec["text"], metadata=rec["metadata"])
+
+    def search(self, search: str):
+        pos = self._pos.get(search)
+        if pos is None:
+            return f"ID {search} not found."  # same contract as InMemoryDocstore
+        return self._read(pos)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def iter_documents(self) -> Iterator[Tuple[str, LCDocument]]:
+        for pos, doc_id in enumerate(self.ids):
+            yield doc_id, self._read(pos)
+
+
+def is_readonly(vs: FAISS) -> bool:
+    return isinstance(vs.docstore, LazyDocstore)
+
+
+def save_readonly(vs: FAISS, path: str) -> None:
+    """Write a snapshot of vs to `path` (atomic directory rename; a concurrent writer wins)."""
+    faiss = _faiss()
+    with atomic_dir(path) as tmp:
+        ids = [vs.index_to_docstore_id[pos] for pos in range(vs.index.ntotal)]
+        offsets = np.zeros(len(ids) + 1, dtype=np.uint64)
+        with open(os.path.join(tmp, CHUNKS_FILE), "wb") as f:
+            for pos, doc_id in enumerate(ids):
+                doc = vs.docstore.search(doc_id)
+                f.write(json.dumps({"id": doc_id, "text": doc.page_content, "metadata": doc.metadata}).encode("utf-8") + b"\n")
+                offsets[pos + 1] = f.tell()
+        np.save(os.path.join(tmp, OFFSETS_FILE), offsets)
+        with open(os.path.join(tmp, IDS_FILE), "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+        faiss.write_index(vs.index, os.path.join(tmp, INDEX_FILE))
+
+
+def load_readonly(path: str, embed: Embeddings) -> FAISS:
+    """Open a snapshot with the vector data memory-mapped and chunk records read lazily."""
+    faiss = _faiss()
+    # MMAP_IFC (faiss >= 1.9) maps flat / HNSW storage and IVF lists; it cannot be combined with IO_FLAG_MMAP
+    flags = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    index = faiss.read_index(os.path.join(path, INDEX_FILE), flags)
+    with open(os.path.join(path, IDS_FILE), encoding="utf-8") as f:
+        ids = json.load(f)
+    return FAISS(embed, index, LazyDocstore(path, ids), dict(enumerate(ids)))
+
+
+def materialize(vs: FAISS, new_store: Callable[[], Docstore] = InMemoryDocstore) -> FAISS:
+    """Private, mutable copy of a read-only snapshot (vs itself if already mutable)."""
+    if not is_readonly(vs):
+        return vs
+    faiss = _faiss()
+    # clone_index would keep viewing the mapped file; a serialize round-trip owns its data
+    index = faiss.deserialize_index(faiss.serialize_index(vs.index))
+    docstore = new_store()
+    batch = {}
+    for doc_id, doc in vs.docstore.iter_documents():
+        batch[doc_id] = doc
+        if len(batch) >= 1000:
+            docstore.add(batch)
+            batch = {}
+    if batch:
+        docstore.add(batch)
+    return FAISS(vs.embedding_function, index, docstore, dict(vs.index_to_docstore_id))
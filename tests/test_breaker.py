@@ -0,0 +1,175 @@
+"""Circuit breaker state transitions and Gemini -> LocalLLM failover (src.llm.breaker)."""
+import pytest
+from src.llm import gemini
+from src.llm.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, FailoverLLM
+from src.utils import aio
+
+
+class Primary:
+    """Gemini-like client: fails its first `failures` attempts; records max_retries per call."""
+
+    backend = "gemini"
+
+    def __init__(self, failures: int = 10 ** 6):
+        self.failures = failures
+        self.calls = []
+
+    def _attempt(self, prompt: str, max_retries: int) -> str:
+        self.calls.append(max_retries)
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("503 unavailable")
+        return f"primary: {prompt}"
+
+    def generate(self, prompt: str, max_retries: int = 3) -> str:
+        return self._attempt(prompt, max_retries)
+
+    async def agenerate(self, prompt: str, max_retries: int = 3) -> str:
+        return self._attempt(prompt, max_retries)
+
+    def stream(self, prompt: str, max_retries: int = 3):
+        yield self._attempt(prompt, max_retries)
+
+
+class Local:
+    backend = "local"
+
+    def __init__(self, can_generate: bool = True):
+        self.can_generate = can_generate
+
+    def generate(self, prompt: str) -> str:
+        return ("local: " if self.can_generate else "Fallback (no local model). ") + prompt
+
+    def generate_batch(self, prompts):
+        return [self.generate(p) for p in prompts]
+
+    def stream(self, prompt: str):
+        yield self.generate(prompt)
+
+
+def make(primary, fallback=None, failures: int = 2):
+    built = []
+
+    def factory():
+        built.append(fallback or Local())
+        return built[-1]
+
+    return FailoverLLM(primary, factory, CircuitBreaker("test", failures, cooldown_s=60)), built
+
+
+def expire_cooldown(breaker: CircuitBreaker) -> None:
+    breaker._opened_at -= breaker.cooldown_s
+
+
+def test_closed_calls_keep_client_retries():
+    primary = Primary(failures=0)
+    llm, built = make(primary)
+    assert llm.generate("q") == "primary: q"
+    assert primary.calls == [3]  # client default, not a single attempt
+    assert llm.breaker.state == CLOSED and not built
+
+
+def test_transient_gemini_error_is_retried_by_the_client(monkeypatch):
+    class Model:
+        calls = 0
+
+        def generate_content(self, prompt, generation_config=None):
+            Model.calls += 1
+            if Model.calls == 1:
+                raise RuntimeError("429 Resource exhausted, retry in 0.1s")
+            return type("Rsp", (), {"text": "answer"})()
+
+    class Limiter:
+        def acquire(self, n):
+            return 0.0
+
+    client = gemini.GeminiClient.__new__(gemini.GeminiClient)
+    client.model, client.limiter, client.temperature, client.max_tokens = Model(), Limiter(), 0.0, 64
+    monkeypatch.setattr(gemini, "backoff_delay", lambda attempt, err: 0.0)
+    llm, _ = make(client)
+    assert llm.generate("q") == "answer"
+    assert llm.breaker.failures == 0
+
+
+def test_exhausted_calls_raise_until_the_circuit_opens():
+    primary = Primary()
+    llm, built = make(primary, failures=2)
+    with pytest.raises(RuntimeError):
+        llm.generate("q")
+    assert llm.breaker.state == CLOSED and llm.breaker.failures == 1
+    assert not built  # one failed call does not load the local model
+    assert llm.generate("q") == "local: q"  # second failure opens the circuit and fails over
+    assert llm.breaker.state == OPEN and llm.breaker.trips == 1 and len(built) == 1
+
+
+def test_open_circuit_short_circuits_the_primary():
+    primary = Primary()
+    llm, built = make(primary, failures=1)
+    llm.generate("a")
+    n = len(primary.calls)
+    assert llm.generate("b") == "local: b"
+    assert aio.run(llm.agenerate("c")) == "local: c"
+    assert "".join(llm.stream("d")) == "local: d"
+    assert llm.generate_batch(["e", "f"]) == ["local: e", "local: f"]
+    assert len(primary.calls) == n
+    assert llm.backend == "local" and len(built) == 1
+
+
+def test_half_open_probe_has_one_attempt_and_closes_on_success():
+    primary = Primary(failures=1)
+    llm, _ = make(primary, failures=1)
+    llm.generate("a")
+    expire_cooldown(llm.breaker)
+    assert llm.generate("b") == "primary: b"
+    assert primary.calls[-1] == 1
+    assert llm.breaker.state == CLOSED and llm.breaker.failures == 0
+    assert llm.backend == "gemini"
+
+
+def test_failed_probe_reopens_the_circuit():
+    primary = Primary()
+    llm, _ = make(primary, failures=1)
+    llm.generate("a")
+    expire_cooldown(llm.breaker)
+    assert llm.generate("b") == "local: b"
+    assert primary.calls == [3, 1]
+    assert llm.breaker.state == OPEN and llm.breaker.trips == 2
+
+
+def test_only_one_probe_in_flight():
+    breaker = CircuitBreaker("probe", 1, cooldown_s=60)
+    breaker.record_failure(RuntimeError("down"))
+    assert not breaker.allow()
+    expire_cooldown(breaker)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_stub_fallback_never_answers():
+    llm, built = make(Primary(), fallback=Local(can_generate=False), failures=1)
+    with pytest.raises(RuntimeError):
+        llm.generate("q")
+    assert llm.breaker.state == OPEN and len(built) == 1
+    with pytest.raises(RuntimeError):
+        llm.generate("q")
+    with pytest.raises(RuntimeError):
+        aio.run(llm.agenerate("q"))
+    with pytest.raises(RuntimeError):
+        "".join(llm.stream("q"))
+    assert not llm.can_generate  # callers that check first take their heuristic paths
+
+
+def test_stream_interrupted_after_first_piece_is_not_replayed():
+    class Interrupted(Primary):
+        def stream(self, prompt, max_retries=3):
+            yield "partial"
+            raise RuntimeError("connection reset")
+
+    llm, built = make(Interrupted(), failures=5)
+    pieces = []
+    with pytest.raises(RuntimeError):
+        for piece in llm.stream("q"):
+            pieces.append(piece)
+    assert pieces == ["partial"] and not built